@@ -1,5 +1,9 @@
 import os
 import asyncio
+import functools
+import signal
+import sys
+import time
 import discord
 import logging
 from logging.handlers import TimedRotatingFileHandler
@@ -10,7 +14,14 @@ from discord.ext import commands
 from dotenv import load_dotenv
 from pathlib import Path
 from remind.util import discord_common
-from remind.util import clist_api
+from remind.util import contest_feed
+from remind.util import periodic
+from remind.util import shutdown
+from remind.util import tracing
+from remind.util import watchdog
+
+_PRESENCE_UPDATE_PERIOD = 30 * 60  # seconds
+_START = time.perf_counter()
 
 
 def setup():
@@ -51,18 +62,68 @@ def main():
     if remind_moderator_role:
         constants.REMIND_MODERATOR_ROLE = remind_moderator_role
 
+    judges_config = os.getenv('JUDGES_CONFIG')
+    if judges_config:
+        constants.JUDGES_CONFIG_PATH = judges_config
+
+    shard_count = os.getenv('SHARD_COUNT')
+    if shard_count:
+        constants.SHARD_COUNT = int(shard_count)
+    shard_ids = os.getenv('SHARD_IDS')
+    if shard_ids:
+        if constants.SHARD_COUNT is None:
+            logging.error('SHARD_COUNT required with SHARD_IDS')
+            return
+        constants.SHARD_IDS = list(map(int, shard_ids.split(",")))
+
+    reminder_prepare_lead = os.getenv('REMINDER_PREPARE_LEAD')
+    if reminder_prepare_lead:
+        constants.REMINDER_PREPARE_LEAD = int(reminder_prepare_lead)
+
+    calendar_port = os.getenv('CALENDAR_PORT')
+    if calendar_port:
+        constants.CALENDAR_PORT = int(calendar_port)
+        constants.CALENDAR_HOST = os.getenv('CALENDAR_HOST',
+                                            constants.CALENDAR_HOST)
+        base_url = os.getenv('CALENDAR_BASE_URL')
+        if base_url:
+            constants.CALENDAR_BASE_URL = base_url.rstrip('/')
+
+    constants.TRACING = bool(os.getenv('TRACING'))
+    loop_watchdog_ms = os.getenv('LOOP_WATCHDOG_MS')
+    if loop_watchdog_ms:
+        constants.LOOP_WATCHDOG_THRESHOLD = int(loop_watchdog_ms) / 1000
+
+    contest_feed_role = os.getenv('CONTEST_FEED_ROLE')
+    if contest_feed_role:
+        if contest_feed_role not in (contest_feed.FETCHER,
+                                     contest_feed.WORKER):
+            logging.error(f'Unknown CONTEST_FEED_ROLE {contest_feed_role}')
+            return
+        constants.CONTEST_FEED_ROLE = contest_feed_role
+
     setup()
 
     intents = discord.Intents.default()
     intents.members = True
-    bot = commands.Bot(
-        command_prefix=commands.when_mentioned_or('t;'),
-        intents=intents)
+    if constants.SHARD_COUNT is None:
+        bot = commands.Bot(
+            command_prefix=commands.when_mentioned_or('t;'),
+            intents=intents,
+            chunk_guilds_at_startup=False)
+    else:
+        bot = commands.AutoShardedBot(
+            command_prefix=commands.when_mentioned_or('t;'),
+            intents=intents,
+            shard_count=constants.SHARD_COUNT,
+            shard_ids=constants.SHARD_IDS,
+            chunk_guilds_at_startup=False)
 
     cogs = [file.stem for file in Path('remind', 'cogs').glob('*.py')]
     for extension in cogs:
         bot.load_extension(f'remind.cogs.{extension}')
-    logging.info(f'Cogs loaded: {", ".join(bot.cogs)}')
+    logging.info(f'Cogs loaded: {", ".join(bot.cogs)} '
+                 f'({time.perf_counter() - _START:.2f}s after start)')
 
     def no_dm_check(ctx):
         if ctx.guild is None:
@@ -72,14 +133,32 @@ def main():
     # Restrict bot usage to inside guild channels only.
     bot.add_check(no_dm_check)
 
+    if constants.TRACING:
+        bot.before_invoke(tracing.before_invoke)
+        bot.after_invoke(tracing.after_invoke)
+
     @discord_common.on_ready_event_once(bot)
     async def init():
-        clist_api.cache()
-        asyncio.create_task(discord_common.presence(bot))
+        logging.info(f'Ready {time.perf_counter() - _START:.2f}s after start')
+        # Contests are refreshed in the background by the Reminders cog.
+        # Presence is dropped on some reconnects, so keep setting it.
+        periodic.PeriodicJob(
+            'presence', functools.partial(discord_common.presence, bot),
+            _PRESENCE_UPDATE_PERIOD).start()
+        if constants.TRACING:
+            tracing.start()
+        if constants.LOOP_WATCHDOG_THRESHOLD is not None:
+            watchdog.start(constants.LOOP_WATCHDOG_THRESHOLD)
+        # `docker stop` and friends; replaces discord.py's abrupt handler.
+        loop = asyncio.get_event_loop()
+        loop.add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(
+            shutdown.shutdown(bot, 0)))
 
     bot.add_listener(discord_common.bot_error_handler, name='on_command_error')
+    bot.exit_code = None
     bot.run(token)
+    return bot.exit_code
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""Offline benchmarks for the reminder hot paths.
+
+Runs the `Reminders` cog against synthetic clist payloads and a fake
+bot/guild/channel layer, so no tokens or network access are needed.
+
+    python -m remind.bench --guilds 1000 10000 100000 --json bench.json
+"""
+import argparse
+import asyncio
+import datetime as dt
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from remind import constants
+from remind.util import fakes
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(name, guilds, samples, calls, elapsed, peak):
+    return {
+        'name': name,
+        'guilds': guilds,
+        'calls': calls,
+        'throughput': calls / elapsed if elapsed else float('inf'),
+        'mean_ms': statistics.mean(samples) * 1000,
+        'p50_ms': _percentile(samples, 50) * 1000,
+        'p95_ms': _percentile(samples, 95) * 1000,
+        'p99_ms': _percentile(samples, 99) * 1000,
+        'peak_kib': peak / 1024,
+    }
+
+
+def _peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _measure(name, guilds, func, items, repeat):
+    """Times `func(item)` for every item, `repeat` times over."""
+    samples = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            begin = time.perf_counter()
+            func(item)
+            samples.append(time.perf_counter() - begin)
+    elapsed = time.perf_counter() - start
+    peak = _peak_memory(lambda: [func(item) for item in items])
+    return _summary(name, guilds, samples, len(samples), elapsed, peak)
+
+
+def _make_cog(guild_count, contest_count, seed):
+    from remind.cogs import reminders
+
+    now = dt.datetime.utcnow()
+    db = {
+        'querytime': now.timestamp(),
+        'objects': fakes.make_clist_objects(contest_count, seed=seed),
+    }
+    with open(constants.CONTESTS_DB_FILE_PATH, 'w') as f:
+        json.dump(db, f)
+
+    guilds = fakes.make_guilds(guild_count)
+    cog = reminders.Reminders(fakes.FakeBot(guilds))
+    fakes.fill_guild_map(cog.guild_map, guilds,
+                         reminders.get_default_guild_settings, seed=seed)
+    cog._generate_contest_cache()
+    cog._partition_contests(now)
+    return cog, guilds
+
+
+def _cancel_all(cog):
+    for task in cog.send_time_tasks.values():
+        task.cancel()
+
+
+async def _bench_reschedule(cog, guild_count, repeat):
+    samples = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        cog._reschedule_all_tasks()
+        samples.append(time.perf_counter() - begin)
+    elapsed = time.perf_counter() - start
+    tasks = len(cog.send_time_tasks)
+    peak = _peak_memory(cog._reschedule_all_tasks)
+    _cancel_all(cog)
+    # Let the cancellations run so the next size starts from a clean loop.
+    await asyncio.sleep(0)
+    result = _summary('reschedule_all_tasks', guild_count, samples,
+                      guild_count * repeat, elapsed, peak)
+    result['tasks'] = tasks
+    return result
+
+
+def run(guild_counts, contest_count, repeat, seed):
+    from remind.cogs import reminders
+
+    results = []
+    for guild_count in guild_counts:
+        cog, guilds = _make_cog(guild_count, contest_count, seed)
+        guild_ids = [guild.id for guild in guilds]
+        results.append(asyncio.run(
+            _bench_reschedule(cog, guild_count, repeat)))
+
+        results.append(_measure(
+            'get_guild_contests', guild_count,
+            lambda guild_id: cog.get_guild_contests(
+                cog.future_contests, guild_id),
+            guild_ids, repeat))
+
+        pages = [(cog.get_guild_contests(cog.future_contests, guild_id)[:5],
+                  cog.guild_map[guild_id].localtimezone)
+                 for guild_id in guild_ids]
+        pages = [page for page in pages if page[0]]
+        results.append(_measure(
+            'embed_fields_from_contests', guild_count,
+            lambda page: reminders._get_embed_fields_from_contests(*page),
+            pages, repeat))
+
+        result = _measure(
+            'serialize_guild_map', guild_count,
+            lambda _: cog._serialize_guild_map(), [None], repeat)
+        result['bytes'] = os.path.getsize(constants.GUILD_SETTINGS_MAP_PATH)
+        results.append(result)
+    return results
+
+
+def _print_table(results):
+    header = ('benchmark', 'guilds', 'ops/s', 'p50 ms', 'p95 ms', 'p99 ms',
+              'peak KiB')
+    print('{:<28}{:>9}{:>12}{:>10}{:>10}{:>10}{:>11}'.format(*header))
+    for r in results:
+        print(f'{r["name"]:<28}{r["guilds"]:>9}{r["throughput"]:>12.0f}'
+              f'{r["p50_ms"]:>10.3f}{r["p95_ms"]:>10.3f}{r["p99_ms"]:>10.3f}'
+              f'{r["peak_kib"]:>11.0f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--guilds', type=int, nargs='+',
+                        default=[1000])
+    parser.add_argument('--contests', type=int, default=200,
+                        help='synthetic contests per clist payload')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='PATH',
+                        help='also write the results as JSON to PATH')
+    parser.add_argument('--verbose', action='store_true',
+                        help='keep the cogs\' INFO logging enabled')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        constants.CONTESTS_DB_FILE_PATH = os.path.join(
+            data_dir, 'contests.json')
+        constants.GUILD_SETTINGS_MAP_PATH = os.path.join(
+            data_dir, 'guild_settings_map')
+        constants.USER_SETTINGS_MAP_PATH = os.path.join(
+            data_dir, 'user_settings_map')
+        constants.CONTEST_ARCHIVE_DIR = os.path.join(data_dir, 'archive')
+        constants.DELIVERY_LOG_DIR = os.path.join(data_dir, 'deliveries')
+        constants.SHUTDOWN_CHECKPOINT_PATH = os.path.join(
+            data_dir, 'shutdown_checkpoint')
+        results = run(args.guilds, args.contests, args.repeat, args.seed)
+
+    _print_table(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
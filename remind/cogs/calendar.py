@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import logging
+
+from discord.ext import commands
+
+from remind import constants
+from remind.util import clock
+from remind.util import discord_common
+from remind.util import ical
+
+_CALENDAR_NAME = 'Contests'
+# Calendar clients poll on their own schedule; this only hints at it.
+_CALENDAR_MAX_AGE = 10 * 60  # seconds
+
+
+class CalendarCogError(commands.CommandError):
+    pass
+
+
+def _filter_key(settings):
+    # Guild settings only hold their overrides of the judge defaults.
+    allowed = settings.website_allowed_patterns
+    disallowed = settings.website_disallowed_patterns
+    return tuple((website, allowed[website], disallowed[website])
+                 for website in sorted(set(allowed) | set(disallowed)))
+
+
+def _event_key(contest):
+    return (contest.name, contest.start_time, contest.duration, contest.url,
+            contest.website)
+
+
+def _etag_matches(if_none_match, etag):
+    tags = (tag.strip() for tag in if_none_match.split(','))
+    return any(tag in ('*', etag, f'W/{etag}') for tag in tags)
+
+
+class Calendar(commands.Cog):
+    """Serves the contests each guild is reminded about as iCalendar feeds
+    at /calendar/<guild_id>.ics."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        # Maps the guild filters to (body, etag) for `contest_version`.
+        self.feeds = {}
+        self.contest_version = None
+        # Maps contest id to (event key, rendered VEVENT), so a new contest
+        # version only renders the contests that changed.
+        self.events = {}
+        self.runner = None
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @commands.Cog.listener()
+    @discord_common.once
+    async def on_ready(self):
+        from aiohttp import web
+        bot = self.bot
+
+        async def serve_calendar(request):
+            # Goes through the bot so a reloaded cog serves the requests.
+            return await bot.get_cog('Calendar')._serve_calendar(request)
+
+        app = web.Application()
+        app.router.add_get('/calendar/{guild_id}.ics', serve_calendar)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, constants.CALENDAR_HOST,
+                           constants.CALENDAR_PORT)
+        await site.start()
+        self.logger.info(f'Serving calendars on {constants.CALENDAR_HOST}:'
+                         f'{constants.CALENDAR_PORT}')
+
+    def cog_unload(self):
+        if self.runner is not None:
+            asyncio.create_task(self.runner.cleanup())
+            self.runner = None
+
+    async def cog_shutdown(self, deadline):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def cog_handover(self):
+        # The server keeps running for the reloaded cog.
+        state = {'runner': self.runner}
+        self.runner = None
+        return state
+
+    def cog_takeover(self, state):
+        if state and state['runner'] is not None:
+            self.runner = state['runner']
+        else:
+            asyncio.create_task(self.on_ready())
+
+    def _sync_version(self, reminders):
+        if reminders.contest_version == self.contest_version:
+            return
+        self.contest_version = reminders.contest_version
+        self.feeds.clear()
+        contest_ids = {contest.id for contest in reminders.contest_cache}
+        self.events = {contest_id: event
+                       for contest_id, event in self.events.items()
+                       if contest_id in contest_ids}
+
+    def _render_event(self, contest):
+        key = _event_key(contest)
+        cached = self.events.get(contest.id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        event = ical.event(contest, clock.utcnow().replace(microsecond=0))
+        self.events[contest.id] = (key, event)
+        return event
+
+    def get_feed(self, reminders, settings):
+        """Returns the (body, etag) of the calendar for guild `settings`."""
+        self._sync_version(reminders)
+        key = _filter_key(settings)
+        feed = self.feeds.get(key)
+        if feed is None:
+            allowed_patterns = settings.website_allowed_patterns.merged()
+            disallowed_patterns = \
+                settings.website_disallowed_patterns.merged()
+            contests = [contest for contest in reminders.contest_cache
+                        if contest.is_desired(allowed_patterns,
+                                              disallowed_patterns)]
+            events = [self._render_event(contest) for contest in contests]
+            body = ical.calendar(_CALENDAR_NAME, events).encode()
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            feed = self.feeds[key] = (body, etag)
+        return feed
+
+    async def _serve_calendar(self, request):
+        from aiohttp import web
+        reminders = self.bot.get_cog('Reminders')
+        try:
+            guild_id = int(request.match_info['guild_id'])
+        except ValueError:
+            raise web.HTTPNotFound()
+        if self.bot.get_guild(guild_id) is None:
+            raise web.HTTPNotFound()
+        if reminders is None or reminders.contest_cache is None:
+            raise web.HTTPServiceUnavailable()
+        settings = reminders.guild_map[guild_id]
+        body, etag = self.get_feed(reminders, settings)
+        headers = {'ETag': etag,
+                   'Cache-Control': f'max-age={_CALENDAR_MAX_AGE}'}
+        if _etag_matches(request.headers.get('If-None-Match', ''), etag):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, headers=headers,
+                            content_type='text/calendar', charset='utf-8')
+
+    @commands.command(brief='Link to the contest calendar of this server')
+    async def calendar(self, ctx):
+        """Calendar feed of the contests this server is reminded about, to
+        subscribe to from any calendar app."""
+        if constants.CALENDAR_BASE_URL is None:
+            raise CalendarCogError('Calendar links are not configured.')
+        url = f'{constants.CALENDAR_BASE_URL}/calendar/{ctx.guild.id}.ics'
+        await ctx.send(embed=discord_common.embed_success(
+            f'Subscribe to {url} in your calendar app.'))
+
+    @discord_common.send_error_if(CalendarCogError)
+    async def cog_command_error(self, ctx, error):
+        pass
+
+
+def setup(bot):
+    if constants.CALENDAR_PORT is None:
+        return
+    bot.add_cog(Calendar(bot))
@@ -3,6 +3,7 @@ import logging
 import os
 
 from discord.ext import commands
+from remind.util import clock
 from remind.util import discord_common
 
 root_logger = logging.getLogger()
@@ -10,6 +11,9 @@ logger = logging.getLogger(__name__)
 
 
 class Logging(commands.Cog, logging.Handler):
+    # Shut down after the other cogs, to send what they log meanwhile.
+    shutdown_order = 1
+
     def __init__(self, bot, channel_id):
         logging.Handler.__init__(self)
         self.bot = bot
@@ -29,6 +33,22 @@ class Logging(commands.Cog, logging.Handler):
         self.logger.log(level=100, msg=msg)
         self.logger.log(level=100, msg=stars)
 
+    async def cog_shutdown(self, deadline):
+        if self.task is None or self.task.done():
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(),
+                                   max(0, deadline - clock.timestamp()))
+        except asyncio.TimeoutError:
+            pass
+
+    def cog_unload(self):
+        root_logger.removeHandler(self)
+        self.close()
+
+    def cog_takeover(self, state):
+        self.task = asyncio.create_task(self._log_task())
+
     async def _log_task(self):
         while True:
             record = await self.queue.get()
@@ -45,11 +65,22 @@ class Logging(commands.Cog, logging.Handler):
                 await channel.send(msg)
             except BaseException:
                 self.handleError(record)
+            finally:
+                self.queue.task_done()
 
     # logging.Handler overrides below.
 
     def emit(self, record):
-        self.queue.put_nowait(record)
+        try:
+            on_loop = asyncio.get_running_loop() is self.bot.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self.queue.put_nowait(record)
+        elif not self.bot.loop.is_closed():
+            # Logged from the watchdog or an executor thread; the queue
+            # is not thread-safe and the loop may be waiting on it.
+            self.bot.loop.call_soon_threadsafe(self.queue.put_nowait, record)
 
     def close(self):
         if self.task:
@@ -1,49 +1,77 @@
+import asyncio
+import collections
+import datetime as dt
 import os
-import subprocess
-import sys
 import time
 import textwrap
 
 from discord.ext import commands
 from remind.util.discord_common import pretty_time_format
+from remind.util import circuit_breaker
 from remind.util import clist_api
+from remind.util import clock
+from remind.util import contest_feed
+from remind.util import delivery_log
+from remind.util import periodic
+from remind.util import shutdown
+from remind.util import tracing
+from remind.util import watchdog
 from remind import constants
 
 RESTART = 42
+_PROFILE_MAX_SECONDS = 60
+_PROFILE_TOP = 10
+_STALLS_SHOWN = 5
+_STALL_STACK_LINES = 12
+_SUBPROCESS_TIMEOUT = 10  # seconds
+_DELIVERIES_SHOWN = 15
 
 
 # Adapted from numpy sources.
 # https://github.com/numpy/numpy/blob/master/setup.py#L64-85
-def git_history():
-    def _minimal_ext_cmd(cmd):
-        # construct minimal environment
-        env = {}
-        for k in ['SYSTEMROOT', 'PATH']:
-            v = os.environ.get(k)
-            if v is not None:
-                env[k] = v
-        # LANGUAGE is used on win32
-        env['LANGUAGE'] = 'C'
-        env['LANG'] = 'C'
-        env['LC_ALL'] = 'C'
-        out = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            env=env).communicate()[0]
-        return out
+async def _minimal_ext_cmd(cmd, timeout=_SUBPROCESS_TIMEOUT):
+    """Runs `cmd` without blocking the event loop and returns its stdout,
+    killing it after `timeout` seconds."""
+    # construct minimal environment
+    env = {}
+    for k in ['SYSTEMROOT', 'PATH']:
+        v = os.environ.get(k)
+        if v is not None:
+            env[k] = v
+    # LANGUAGE is used on win32
+    env['LANGUAGE'] = 'C'
+    env['LANG'] = 'C'
+    env['LC_ALL'] = 'C'
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+        env=env)
     try:
-        out = _minimal_ext_cmd(['git', 'rev-parse', '--abbrev-ref', 'HEAD'])
-        branch = out.strip().decode('ascii')
-        out = _minimal_ext_cmd(['git', 'log', '--oneline', '-5'])
-        history = out.strip().decode('ascii')
-        return (
-            'Branch:\n' +
-            textwrap.indent(branch, '  ') +
-            '\nCommits:\n' +
-            textwrap.indent(history, '  ')
-        )
-    except OSError:
-        return "Fetching git info failed"
+        out, _ = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise
+    return out
+
+
+async def git_history():
+    """Returns the branch and latest commits, or None when git fails."""
+    try:
+        out = await _minimal_ext_cmd(
+            ['git', 'rev-parse', '--abbrev-ref', 'HEAD'])
+        branch = out.strip().decode(errors='replace')
+        out = await _minimal_ext_cmd(['git', 'log', '--oneline', '-5'])
+        history = out.strip().decode(errors='replace')
+    except (OSError, asyncio.TimeoutError):
+        return None
+    return (
+        'Branch:\n' +
+        textwrap.indent(branch, '  ') +
+        '\nCommits:\n' +
+        textwrap.indent(history, '  ')
+    )
 
 
 def check_if_superuser(ctx):
@@ -54,6 +82,16 @@ class Meta(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.start_time = time.time()
+        # The checkout does not change while the bot runs.
+        self.git_info = None
+
+    def cog_handover(self):
+        return {'start_time': self.start_time, 'git_info': self.git_info}
+
+    def cog_takeover(self, state):
+        if state:
+            self.start_time = state['start_time']
+            self.git_info = state.get('git_info')
 
     @commands.group(brief='Bot control', invoke_without_command=True)
     async def meta(self, ctx):
@@ -67,14 +105,46 @@ class Meta(commands.Cog):
         # Really, we just exit with a special code
         # the magic is handled elsewhere
         await ctx.send('Restarting...')
-        os._exit(RESTART)
+        await shutdown.shutdown(self.bot, RESTART)
 
     @meta.command(brief='Kill Remind')
     @commands.check(check_if_superuser)
     async def kill(self, ctx):
         """Restarts the bot."""
         await ctx.send('Dying...')
-        os._exit(0)
+        await shutdown.shutdown(self.bot, 0)
+
+    @meta.command(brief='Reload a cog in place')
+    @commands.check(check_if_superuser)
+    async def reload(self, ctx, cog: str):
+        """Reloads the code of a cog without restarting the bot. The old
+        cog hands its state (contests, prepared reminders, ...) over to the
+        new one.
+        e.g t;meta reload reminders"""
+        extension = f'remind.cogs.{cog}'
+        if extension not in self.bot.extensions:
+            await ctx.send(f'```No cog {cog} loaded```')
+            return
+        states = {name: loaded.cog_handover()
+                  for name, loaded in self.bot.cogs.items()
+                  if loaded.__module__ == extension and
+                  hasattr(loaded, 'cog_handover')}
+        error = None
+        try:
+            self.bot.reload_extension(extension)
+        except commands.ExtensionError as e:
+            # discord.py put the previous version back; it takes the state.
+            error = e
+        # Cogs of the module get the state back whether or not the reload
+        # worked, as the old instances were unloaded either way.
+        for name, loaded in list(self.bot.cogs.items()):
+            if loaded.__module__ == extension and \
+                    hasattr(loaded, 'cog_takeover'):
+                loaded.cog_takeover(states.get(name))
+        if error is not None:
+            await ctx.send(f'```Reloading {cog} failed: {error}```')
+        else:
+            await ctx.send(f'```Reloaded {cog}```')
 
     @meta.command(brief='Is Remind up?')
     async def ping(self, ctx):
@@ -90,7 +160,10 @@ class Meta(commands.Cog):
     @meta.command(brief='Get git information')
     async def git(self, ctx):
         """Replies with git information."""
-        await ctx.send('```yaml\n' + git_history() + '```')
+        if self.git_info is None:
+            self.git_info = await git_history()
+        git_info = self.git_info or 'Fetching git info failed'
+        await ctx.send('```yaml\n' + git_info + '```')
 
     @meta.command(brief='Prints bot uptime')
     async def uptime(self, ctx):
@@ -103,19 +176,202 @@ class Meta(commands.Cog):
     async def guilds(self, ctx):
         "Replies with info on the bot's guilds"
         msg = [f'Guild ID: {guild.id} | Name: {guild.name}'
-               f'| Owner: {guild.owner.id} | Icon: {guild.icon_url}'
+               f'| Owner: {guild.owner_id} | Icon: {guild.icon_url}'
                for guild in self.bot.guilds]
         await ctx.send('```' + '\n'.join(msg) + '```')
 
+    @meta.command(brief='Print shard latencies')
+    @commands.check(check_if_superuser)
+    async def shards(self, ctx):
+        "Replies with the shards run by this process and their latency"
+        latencies = getattr(self.bot, 'latencies', [(None, self.bot.latency)])
+        guild_counts = collections.Counter(
+            guild.shard_id for guild in self.bot.guilds)
+        msg = [f'Shard: {shard_id} | Guilds: {guild_counts[shard_id]}'
+               f' | Latency: {int(latency * 1000)}ms'
+               for shard_id, latency in latencies]
+        await ctx.send('```' + '\n'.join(msg) + '```')
+
+    @meta.command(brief='Show contest cache status')
+    async def cache(self, ctx):
+        "Replies with the state of the clist circuit breaker."
+        breaker = clist_api.breaker
+        msg = [f'Circuit: {breaker.state}',
+               f'Consecutive failures: {breaker.failures}']
+        if breaker.state != circuit_breaker.CLOSED:
+            retry_in = max(0, breaker.retry_at - clock.timestamp())
+            msg.append(f'Next attempt in: {pretty_time_format(retry_in)}')
+        if breaker.last_error is not None:
+            msg.append(f'Last error: {breaker.last_error}')
+        await ctx.send('```' + '\n'.join(msg) + '```')
+
+    @meta.command(brief='Show periodic jobs')
+    @commands.check(check_if_superuser)
+    async def jobs(self, ctx):
+        "Replies with the run statistics of the periodic jobs."
+        msg = []
+        for name, job in sorted(periodic.jobs.items()):
+            line = f'{name}: {job.runs} runs, {job.failures} failed'
+            if job.runs:
+                line += (f' | last {job.last_duration * 1000:.0f}ms'
+                         f', mean {job.mean_duration * 1000:.0f}ms'
+                         f', max {job.max_duration * 1000:.0f}ms')
+            if job.running:
+                line += ' | running'
+            if job.last_error is not None:
+                line += f' | last error: {job.last_error!r}'
+            msg.append(line)
+        await ctx.send('```' + ('\n'.join(msg) or 'No jobs running') + '```')
+
+    @meta.command(brief='Show reminder delivery lateness')
+    @commands.check(check_if_superuser)
+    async def lateness(self, ctx):
+        "Replies with how late recent reminders went out."
+        reminders = self.bot.get_cog('Reminders')
+        samples = sorted(reminders.delivery_lateness) if reminders else []
+        if not samples:
+            await ctx.send('```No reminders sent yet```')
+            return
+
+        def percentile(pct):
+            return samples[min(len(samples) - 1, len(samples) * pct // 100)]
+
+        await ctx.send(f'```Last {len(samples)} reminders: '
+                       f'p50 {percentile(50) * 1000:.0f}ms, '
+                       f'p99 {percentile(99) * 1000:.0f}ms, '
+                       f'max {samples[-1] * 1000:.0f}ms late\n'
+                       f'Prepared send times: {len(reminders.outbox)}```')
+
+    @meta.command(brief='Show traced spans and event loop lag')
+    @commands.check(check_if_superuser)
+    async def spans(self, ctx):
+        "Replies with the timings recorded while TRACING is set."
+        if not tracing.enabled:
+            await ctx.send('```Tracing is off; set TRACING to enable it```')
+            return
+        msg = []
+        for name, stats in sorted(tracing.stats.items(),
+                                  key=lambda item: -item[1].total):
+            msg.append(f'{name}: {stats.count} | '
+                       f'last {stats.last * 1000:.0f}ms'
+                       f', mean {stats.mean * 1000:.0f}ms'
+                       f', max {stats.max * 1000:.0f}ms')
+        lag = sorted(tracing.lag)
+        if lag:
+            p99 = lag[min(len(lag) - 1, len(lag) * 99 // 100)]
+            msg.append(f'Loop lag over {len(lag)} samples: '
+                       f'p50 {lag[len(lag) // 2] * 1000:.0f}ms'
+                       f', p99 {p99 * 1000:.0f}ms'
+                       f', max {lag[-1] * 1000:.0f}ms')
+        await ctx.send('```' + ('\n'.join(msg) or 'No spans yet') + '```')
+
+    @meta.command(brief='Show recent event loop stalls')
+    @commands.check(check_if_superuser)
+    async def stalls(self, ctx):
+        "Replies with the callbacks the loop watchdog caught blocking."
+        loop_watchdog = watchdog.current
+        if loop_watchdog is None:
+            await ctx.send('```Watchdog is off; set LOOP_WATCHDOG_MS to '
+                           'enable it```')
+            return
+        stalls = list(loop_watchdog.stalls)
+        msg = [f'{loop_watchdog.stall_count} stalls over '
+               f'{loop_watchdog.threshold * 1000:.0f}ms, '
+               f'max {loop_watchdog.max_stall * 1000:.0f}ms']
+        for stall in stalls[-_STALLS_SHOWN:]:
+            ago = pretty_time_format(time.time() - stall.time,
+                                     only_most_significant=True)
+            msg.append(f'{ago} ago: {stall.duration * 1000:.0f}ms '
+                       f'in {stall.task}')
+        if stalls:
+            stack = stalls[-1].stack.splitlines()[-_STALL_STACK_LINES:]
+            msg.append('\nLast stack:')
+            msg.extend(stack)
+        await ctx.send('```' + '\n'.join(msg)[-1990:] + '```')
+
+    @meta.command(brief='Profile the event loop for a few seconds')
+    @commands.check(check_if_superuser)
+    async def profile(self, ctx, seconds: int = 10):
+        "Samples what the event loop runs and replies with the hotspots."
+        seconds = max(1, min(seconds, _PROFILE_MAX_SECONDS))
+        await ctx.send(f'```Profiling for {seconds}s...```')
+        samples, idle, counts = await tracing.profile(seconds)
+        busy = samples - idle
+        msg = [f'{samples} samples, loop busy in {busy}']
+        for title, index in (('self', 0), ('cumulative', 1)):
+            ranked = sorted(counts.items(), key=lambda item: -item[1][index])
+            msg.append(f'\nTop by {title} samples:')
+            for location, count in ranked[:_PROFILE_TOP]:
+                msg.append(f'{count[index]:>6} {location}')
+        await ctx.send('```' + '\n'.join(msg)[:1990] + '```')
+
+    @meta.command(brief='Show recent reminder deliveries',
+                  usage='[hours] [guild_id] [user_id]')
+    @commands.has_any_role('Admin', constants.REMIND_MODERATOR_ROLE)
+    async def deliveries(self, ctx, hours: int = 24, guild_id: int = None,
+                         user_id: int = None):
+        """Replies with the reminders sent to this server in the last
+        `hours` and how they went. Superusers can look at any server, or
+        at DMs with guild_id 0, optionally to one user."""
+        if guild_id is None:
+            guild_id = ctx.guild.id
+        elif not check_if_superuser(ctx):
+            await ctx.send('```Only superusers can see the deliveries of '
+                           'other servers```')
+            return
+        reminders = self.bot.get_cog('Reminders')
+        if reminders is None:
+            await ctx.send('```Reminders are not loaded```')
+            return
+        await reminders.delivery_log.flush()
+        since = clock.timestamp() - hours * 60 * 60
+        deliveries = await asyncio.get_event_loop().run_in_executor(
+            None, reminders.delivery_log.read, since, guild_id,
+            user_id if not guild_id else None)
+        if not deliveries:
+            await ctx.send(f'```No deliveries in the last {hours} hours```')
+            return
+        outcomes = collections.Counter(
+            delivery_log.OUTCOME_NAMES[delivery.outcome]
+            for delivery in deliveries)
+        msg = [f'{len(deliveries)} deliveries in the last {hours} hours: ' +
+               ', '.join(f'{count} {outcome}'
+                         for outcome, count in outcomes.most_common())]
+        for delivery in deliveries[-_DELIVERIES_SHOWN:]:
+            sent = dt.datetime.utcfromtimestamp(delivery.sent)
+            if not delivery.guild_id:
+                target = (f'user {delivery.channel_id}'
+                          if delivery.channel_id
+                          else f'{delivery.recipients} users')
+            else:
+                channel = self.bot.get_channel(delivery.channel_id)
+                target = (f'#{channel.name}' if channel is not None
+                          else f'channel {delivery.channel_id}')
+            contests = ', '.join(map(str, delivery.contest_ids))
+            msg.append(f'{sent:%d %b %H:%M:%S} UTC | {target} | '
+                       f'{(delivery.sent - delivery.scheduled) * 1000:.0f}ms '
+                       f'late | {delivery_log.OUTCOME_NAMES[delivery.outcome]}'
+                       f' | contests {contests}')
+        await ctx.send('```' + '\n'.join(msg)[-1990:] + '```')
+
     @meta.command(brief='Forcefully reset contests')
     @commands.has_any_role('Admin', constants.REMIND_MODERATOR_ROLE)
     async def resetcache(self, ctx):
         "Resets contest cache."
         try:
-            clist_api.cache(True)
-            await ctx.send('```Cache reset completed. '
-                           'Restart to reschedule all contest reminders.'
-                           '```')
+            # Workers only reload the fetcher's feed.
+            if constants.CONTEST_FEED_ROLE != contest_feed.WORKER:
+                await clist_api.refresh(forced=True)
+            reminders = self.bot.get_cog('Reminders')
+            if reminders is None:
+                await ctx.send('```Cache reset completed.```')
+                return
+            await reminders.update_job.run_now()
+            started, cancelled = reminders.last_reschedule
+            await ctx.send(f'```Cache reset completed. Contest reminders '
+                           f'rescheduled: {started} tasks started, '
+                           f'{cancelled} cancelled, '
+                           f'{len(reminders.send_time_tasks)} scheduled.```')
         except BaseException:
             await ctx.send('```' + 'Cache reset failed.' + '```')
 
@@ -1,17 +1,19 @@
 import asyncio
+import calendar
 import random
 import functools
+import itertools
 import json
 import pickle
+import shutil
 import logging
-import time
 import datetime as dt
 from pathlib import Path
 from recordtype import recordtype
-import pytz
-import copy
+import re
 
 from collections import defaultdict
+from collections import deque
 from collections import namedtuple
 
 import discord
@@ -20,27 +22,90 @@ import os
 
 from remind.util.rounds import Round
 from remind.util import discord_common
+from remind.util import dm_pipeline
 from remind.util import paginator
+from remind.util import periodic
+from remind.util import timezones
+from remind.util import tracing
+from remind.util import clock
+from remind.util import files
+from remind.util import judges
 from remind import constants
 from remind.util import clist_api as clist
+from remind.util import contest_archive
+from remind.util import delivery_log
+from remind.util import contest_feed
+from remind.util import contest_index
 
 _CONTESTS_PER_PAGE = 5
 _CONTEST_PAGINATE_WAIT_TIME = 5 * 60
 _FINISHED_CONTESTS_LIMIT = 5
+_CONTEST_STATS_WEEKS = 8
 _CONTEST_REFRESH_PERIOD = 10 * 60  # seconds
+_CONTEST_REFRESH_JITTER = 30  # seconds
+_CONTEST_FETCH_TIMEOUT = 2 * 60  # seconds
+_LATE_REMINDER_GRACE = 60  # seconds
+_MAX_REMINDER_PROFILES = 10
+_DELIVERY_LATENESS_SAMPLES = 1000
 _GUILD_SETTINGS_BACKUP_PERIOD = 6 * 60 * 60  # seconds
+_DELIVERY_LOG_FLUSH_PERIOD = 5  # seconds
 
-_PYTZ_TIMEZONES_GIST_URL = ('https://gist.github.com/heyalexej/'
-                            '8bf688fd67d7199be4a1682b3eec7568')
+# Owner in `Reminders.reminder_index` of the reminders sent by DM.
+_DM_OWNER = 'dm'
+_SEARCH_DURATION_RE = re.compile(r'(\d+)([mhd]?)')
+_SEARCH_DURATION_UNITS = {'m': 60, 'h': 60 * 60, '': 60 * 60,
+                          'd': 24 * 60 * 60}
+
+_TIMEZONES_GIST_URL = ('https://gist.github.com/heyalexej/'
+                       '8bf688fd67d7199be4a1682b3eec7568')
 
 
 class RemindersCogError(commands.CommandError):
     pass
 
 
+def _parse_search_date(value, localtimezone):
+    try:
+        date = dt.datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise RemindersCogError(f'`{value}` is not a YYYY-MM-DD date')
+    return (date.replace(tzinfo=localtimezone)
+            .astimezone(dt.timezone.utc).replace(tzinfo=None))
+
+
+def _parse_search_duration(value):
+    match = _SEARCH_DURATION_RE.fullmatch(value)
+    if match is None:
+        raise RemindersCogError(f'`{value}` is not a duration like 90m or 3h')
+    amount, unit = match.groups()
+    return dt.timedelta(seconds=int(amount) * _SEARCH_DURATION_UNITS[unit])
+
+
+def _parse_search_query(terms, localtimezone, current_time):
+    """Turns `clist search` terms into `ContestIndex.search` arguments."""
+    query = {'keywords': [], 'websites': [], 'start': current_time}
+    for term in terms:
+        field, _, value = term.lower().partition(':')
+        if not value:
+            query['keywords'].append(term)
+        elif field == 'site':
+            query['websites'].append(value)
+        elif field == 'from':
+            query['start'] = _parse_search_date(value, localtimezone)
+        elif field == 'to':
+            query['end'] = (_parse_search_date(value, localtimezone) +
+                            dt.timedelta(days=1))
+        elif field == 'min':
+            query['min_duration'] = _parse_search_duration(value)
+        elif field == 'max':
+            query['max_duration'] = _parse_search_duration(value)
+        else:
+            raise RemindersCogError(f'Unknown search filter `{field}:`')
+    return query
+
+
 def _contest_start_time_format(contest, tz):
-    start = contest.start_time.replace(tzinfo=dt.timezone.utc).astimezone(tz)
-    return f'{start.strftime("%d %b %y, %H:%M")} {tz}'
+    return f'{timezones.format_utc(contest.start_time, tz)} {tz}'
 
 
 def _contest_duration_format(contest):
@@ -81,12 +146,7 @@ def _get_embed_fields_from_contests(contests, localtimezone):
     return fields
 
 
-async def _send_reminder_at(channel, role, contests, before_secs, send_time,
-                            localtimezone: pytz.timezone):
-    delay = send_time - dt.datetime.utcnow().timestamp()
-    if delay <= 0:
-        return
-    await asyncio.sleep(delay)
+def _make_reminder_embed(contests, before_secs, localtimezone):
     values = discord_common.time_format(before_secs)
 
     def make(value, label):
@@ -101,57 +161,81 @@ async def _send_reminder_at(channel, role, contests, before_secs, send_time,
     for name, value in _get_embed_fields_from_contests(
             contests, localtimezone):
         embed.add_field(name=name, value=value)
-    await channel.send(role.mention, embed=embed)
-
-_WEBSITE_ALLOWED_PATTERNS = defaultdict(list)
-_WEBSITE_ALLOWED_PATTERNS['codeforces.com'] = ['']
-_WEBSITE_ALLOWED_PATTERNS['codechef.com'] = [
-    'lunch', 'cook', 'rated']
-_WEBSITE_ALLOWED_PATTERNS['atcoder.jp'] = [
-    'abc:', 'arc:', 'agc:', 'grand', 'beginner', 'regular']
-_WEBSITE_ALLOWED_PATTERNS['topcoder.com'] = ['srm', 'tco']
-_WEBSITE_ALLOWED_PATTERNS['codingcompetitions.withgoogle.com'] = ['']
-_WEBSITE_ALLOWED_PATTERNS['facebook.com/hackercup'] = ['']
-_WEBSITE_ALLOWED_PATTERNS['codedrills.io'] = ['']
-
-_WEBSITE_DISALLOWED_PATTERNS = defaultdict(list)
-_WEBSITE_DISALLOWED_PATTERNS['codeforces.com'] = [
-    'wild', 'fools', 'kotlin', 'unrated']
-_WEBSITE_DISALLOWED_PATTERNS['codechef.com'] = ['unrated']
-_WEBSITE_DISALLOWED_PATTERNS['atcoder.jp'] = []
-_WEBSITE_DISALLOWED_PATTERNS['topcoder.com'] = []
-_WEBSITE_DISALLOWED_PATTERNS['codingcompetitions.withgoogle.com'] = [
-    'registration']
-_WEBSITE_DISALLOWED_PATTERNS['facebook.com/hackercup'] = []
-_WEBSITE_DISALLOWED_PATTERNS['codedrills.io'] = []
-
-_SUPPORTED_WEBSITES = [
-    'codeforces.com',
-    'codechef.com',
-    'atcoder.jp',
-    'topcoder.com',
-    'codingcompetitions.withgoogle.com',
-    'facebook.com/hackercup',
-    'codedrills.io'
-]
+    return embed
+
+
+# Every judge with the registry's default patterns, to drop the contests no
+# guild can be reminded about.
+_DEFAULT_ALLOWED_PATTERNS = judges.AllowedPatterns()
+_DEFAULT_DISALLOWED_PATTERNS = judges.DisallowedPatterns()
 
 GuildSettings = recordtype(
     'GuildSettings', [
         ('channel_id', None), ('role_id', None),
-        ('before', None), ('localtimezone', pytz.timezone('UTC')),
-        ('website_allowed_patterns', defaultdict(list)),
-        ('website_disallowed_patterns', defaultdict(list))])
+        ('before', None), ('localtimezone', timezones.get('UTC')),
+        ('website_allowed_patterns', judges.AllowedPatterns()),
+        ('website_disallowed_patterns', judges.DisallowedPatterns()),
+        ('profiles', ())])
+
+
+def _set_guild_settings_state(settings, state):
+    # Settings pickled before a field was added lack its value; recordtype's
+    # own __setstate__ would reject them and lose every guild's settings.
+    defaults = GuildSettings()
+    for field in GuildSettings._fields:
+        setattr(settings, field, getattr(defaults, field))
+    for field, value in zip(GuildSettings._fields, state):
+        setattr(settings, field, value)
+
+
+GuildSettings.__setstate__ = _set_guild_settings_state
+
+# Additional reminder destinations of a guild, for contests of `websites`
+# among those the guild's judge settings let through.
+ReminderProfile = namedtuple(
+    'ReminderProfile', 'channel_id role_id websites before')
+
+# A reminder due at some time: either to `role` in `channel`, or by DM to
+# the users of `audience`.
+Reminder = namedtuple(
+    'Reminder', 'channel role audience contests before_secs localtimezone')
+
+# A rendered reminder of the `contest_ids`: `content` to `channel`, or a DM
+# to `user_ids`.
+Payload = namedtuple('Payload', 'channel content embed user_ids contest_ids',
+                     defaults=((),))
+
+# `websites` of None means every supported website.
+UserSettings = recordtype(
+    'UserSettings', [('websites', None), ('before', None)])
 
 
 def get_default_guild_settings():
-    allowed_patterns = copy.deepcopy(_WEBSITE_ALLOWED_PATTERNS)
-    disallowed_patterns = copy.deepcopy(_WEBSITE_DISALLOWED_PATTERNS)
     settings = GuildSettings()
-    settings.website_allowed_patterns = allowed_patterns
-    settings.website_disallowed_patterns = disallowed_patterns
+    settings.website_allowed_patterns = judges.AllowedPatterns()
+    settings.website_disallowed_patterns = judges.DisallowedPatterns()
     return settings
 
 
+# What every guild without settings of its own reads; never changed.
+_DEFAULT_GUILD_SETTINGS = get_default_guild_settings()
+
+
+class GuildSettingsMap(dict):
+    """Maps guild_id to `GuildSettings`, only for guilds that changed their
+    settings. Reading any other guild returns the shared defaults without
+    adding an entry, so call `edit` to get settings that can be changed."""
+
+    def __missing__(self, guild_id):
+        return _DEFAULT_GUILD_SETTINGS
+
+    def edit(self, guild_id):
+        settings = self.get(guild_id)
+        if settings is None:
+            settings = self[guild_id] = get_default_guild_settings()
+        return settings
+
+
 class Reminders(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -159,44 +243,275 @@ class Reminders(commands.Cog):
         self.contest_cache = None
         self.active_contests = None
         self.finished_contests = None
+        # Bumped whenever `contest_cache` is rebuilt from new clist data.
+        self.contest_version = 0
         self.start_time_map = defaultdict(list)
-        self.task_map = defaultdict(list)
+        self.contest_index = contest_index.ContestIndex()
+        self.contest_archive = contest_archive.ContestArchive()
+        # Ids of the finished contests known to be in `contest_archive`.
+        self.archived_contest_ids = set()
+        # Maps send time to {guild_id or _DM_OWNER: [`Reminder`]}, with one
+        # task per send time in `send_time_tasks`.
+        self.reminder_index = defaultdict(dict)
+        self.send_time_tasks = {}
+        self.prepared_send_times = set()
+        # Tasks (started, cancelled) by the last full reschedule.
+        self.last_reschedule = (0, 0)
+        # Maps send time to the `Payload`s prepared for it.
+        self.outbox = {}
+        # Seconds between send times and their reminders going out.
+        self.delivery_lateness = deque(maxlen=_DELIVERY_LATENESS_SAMPLES)
+        self.delivery_log = delivery_log.DeliveryLog()
         # Maps guild_id to `GuildSettings`
-        self.guild_map = defaultdict(get_default_guild_settings)
+        self.guild_map = GuildSettingsMap()
         self.last_guild_backup_time = -1
+        self.contest_feed = contest_feed.FeedReader()
+        # Maps user_id to `UserSettings` for reminders by DM
+        self.user_map = {}
+        self.user_map_mtime = None
+        # Maps (websites, before_mins) to the ids of the users who get
+        # reminders for those websites that many minutes before contests.
+        self.dm_audiences = defaultdict(set)
+        self.dm_pipeline = dm_pipeline.DmPipeline(bot)
+        self.update_job = periodic.PeriodicJob(
+            'contest refresh', self._update_task, _CONTEST_REFRESH_PERIOD,
+            jitter=_CONTEST_REFRESH_JITTER)
+        self.backup_job = periodic.PeriodicJob(
+            'guild settings backup', self._backup_serialize_guild_map,
+            _GUILD_SETTINGS_BACKUP_PERIOD)
+        self.delivery_log_job = periodic.PeriodicJob(
+            'delivery log flush', self._flush_delivery_log,
+            _DELIVERY_LOG_FLUSH_PERIOD)
 
         self.member_converter = commands.MemberConverter()
         self.role_converter = commands.RoleConverter()
 
         self.logger = logging.getLogger(self.__class__.__name__)
+        # (user_ids, content, embed) of DMs left unsent by the last run.
+        self.checkpointed_dms = []
+        # Settings are on disk already, so restore them while the bot is
+        # still connecting rather than once it is ready.
+        self._load_guild_map()
+        self._restore_checkpoint()
+
+    def _load_guild_map(self):
+        guild_map_path = Path(constants.GUILD_SETTINGS_MAP_PATH)
+        try:
+            with guild_map_path.open('rb') as guild_map_file:
+                guild_map = pickle.load(guild_map_file)
+        except FileNotFoundError:
+            return
+        except Exception:
+            self.logger.exception('Could not load guild settings')
+            self._keep_unreadable_guild_map()
+            return
+        failed = False
+        for guild_id, guild_settings in guild_map.items():
+            try:
+                settings = self._convert_guild_settings(guild_settings)
+            except Exception:
+                self.logger.exception(
+                    f'Could not load the settings of guild {guild_id}')
+                failed = True
+                continue
+            # Older files also hold untouched default settings.
+            if settings != _DEFAULT_GUILD_SETTINGS:
+                self.guild_map[guild_id] = settings
+        if failed:
+            self._keep_unreadable_guild_map()
+
+    @staticmethod
+    def _convert_guild_settings(guild_settings):
+        settings = GuildSettings(**{key: value
+                                    for key, value
+                                    in guild_settings._asdict().items()
+                                    if key in GuildSettings._fields})
+        settings.localtimezone = \
+            timezones.from_legacy(settings.localtimezone)
+        settings.website_allowed_patterns = \
+            judges.AllowedPatterns.compact(
+                settings.website_allowed_patterns)
+        settings.website_disallowed_patterns = \
+            judges.DisallowedPatterns.compact(
+                settings.website_disallowed_patterns)
+        return settings
+
+    def _keep_unreadable_guild_map(self):
+        # The next save overwrites the file with what did load, so keep
+        # the original for the settings that did not.
+        path = constants.GUILD_SETTINGS_MAP_PATH
+        copy_path = f'{path}_unreadable_{int(clock.timestamp())}'
+        shutil.copyfile(path, copy_path)
+        self.logger.error(f'Kept the original guild settings in {copy_path}')
 
     @commands.Cog.listener()
     @discord_common.once
     async def on_ready(self):
-        guild_map_path = Path(constants.GUILD_SETTINGS_MAP_PATH)
+        # The first run schedules from the persisted contests, then
+        # refreshes them from clist in the background.
+        self.update_job.start()
+        self.backup_job.start()
+        self.delivery_log_job.start()
+        for user_ids, content, embed in self.checkpointed_dms:
+            self.dm_pipeline.submit(user_ids, content, embed=embed)
+        self.checkpointed_dms = []
+
+    async def cog_shutdown(self, deadline):
+        """Sends the reminders due before `deadline`, then saves settings
+        and a checkpoint of what was sent and what could not be."""
+        self.update_job.stop()
+        self.backup_job.stop()
+        self.delivery_log_job.stop()
+        due = [task for send_time, task in self.send_time_tasks.items()
+               if send_time <= deadline]
+        if due:
+            await asyncio.wait(due,
+                               timeout=max(0, deadline - clock.timestamp()))
         try:
-            with guild_map_path.open('rb') as guild_map_file:
-                guild_map = pickle.load(guild_map_file)
-                for guild_id, guild_settings in guild_map.items():
-                    self.guild_map[guild_id] = \
-                        GuildSettings(**{key: value
-                                         for key, value
-                                         in guild_settings._asdict().items()
-                                         if key in GuildSettings._fields})
-        except BaseException:
+            await asyncio.wait_for(self.dm_pipeline.drain(),
+                                   max(0, deadline - clock.timestamp()))
+        except asyncio.TimeoutError:
             pass
-        asyncio.create_task(self._update_task())
+        await self.delivery_log.flush()
+        self._serialize_guild_map()
+        self._write_checkpoint()
+
+    def _write_checkpoint(self):
+        # Send times in the outbox were prepared but not sent, so the next
+        # start reminds for them again if they are still due by then.
+        sent_send_times = self.prepared_send_times - set(self.outbox)
+        unsent_dms = [(user_ids, content,
+                       embed.to_dict() if embed is not None else None)
+                      for user_ids, content, embed
+                      in self.dm_pipeline.unsent()]
+        checkpoint = {'sent_send_times': sent_send_times,
+                      'unsent_dms': unsent_dms}
+        files.atomic_write(constants.SHUTDOWN_CHECKPOINT_PATH,
+                           pickle.dumps(checkpoint))
+        self.logger.info(f'Checkpointed {len(sent_send_times)} sent send '
+                         f'times and {len(unsent_dms)} unsent DMs')
+
+    def _restore_checkpoint(self):
+        checkpoint_path = Path(constants.SHUTDOWN_CHECKPOINT_PATH)
+        try:
+            with checkpoint_path.open('rb') as checkpoint_file:
+                checkpoint = pickle.load(checkpoint_file)
+            sent_send_times = set(checkpoint['sent_send_times'])
+            checkpointed_dms = [
+                (user_ids, content,
+                 discord.Embed.from_dict(embed) if embed is not None
+                 else None)
+                for user_ids, content, embed in checkpoint['unsent_dms']]
+        except FileNotFoundError:
+            return
+        except Exception:
+            self.logger.exception('Could not restore the shutdown checkpoint')
+            # Moved aside so that the next start does not fail on it again.
+            copy_path = \
+                f'{checkpoint_path}_unreadable_{int(clock.timestamp())}'
+            os.replace(checkpoint_path, copy_path)
+            self.logger.error(f'Kept the checkpoint in {copy_path}')
+            return
+        # Only good for the start right after the shutdown that wrote it.
+        checkpoint_path.unlink()
+        # Keeps reminders sent just before a restart from going out again
+        # within the late reminder grace period.
+        self.prepared_send_times.update(sent_send_times)
+        self.checkpointed_dms = checkpointed_dms
+
+    def cog_unload(self):
+        self.update_job.stop()
+        self.backup_job.stop()
+        self.delivery_log_job.stop()
+        asyncio.create_task(self.delivery_log.flush())
+        for task in self.send_time_tasks.values():
+            task.cancel()
+        if self.dm_pipeline is not None:
+            self.dm_pipeline.close()
+
+    def cog_handover(self):
+        """Hands the contests, prepared reminders and pending DMs over to
+        the instance replacing this cog on `meta reload`. Settings are
+        reloaded from disk instead, as they are instances of this module's
+        classes."""
+        state = {name: getattr(self, name) for name in (
+            'contest_cache', 'contest_version', 'contest_index',
+            'contest_feed', 'archived_contest_ids', 'outbox',
+            'prepared_send_times', 'delivery_lateness', 'delivery_log',
+            'dm_pipeline', 'last_guild_backup_time')}
+        # Keeps the DMs queued in it from being dropped on unload.
+        self.dm_pipeline = None
+        return state
+
+    def cog_takeover(self, state):
+        if state:
+            for name, value in state.items():
+                setattr(self, name, value)
+            if self.contest_cache is not None:
+                self._partition_contests(clock.utcnow())
+            # Payloads are instances of the replaced module's class.
+            self.outbox = {
+                send_time: [Payload(**payload._asdict())
+                            for payload in payloads]
+                for send_time, payloads in self.outbox.items()}
+            # Prepared reminders get their tasks back straight away.
+            self._sync_send_time_tasks()
+        self.update_job.start()
+        self.backup_job.start()
+        self.delivery_log_job.start()
+
+    @commands.Cog.listener()
+    async def on_shard_ready(self, shard_id):
+        # A shard that reconnected with a new session comes back with fresh
+        # guild objects, so only its guilds need new reminder tasks.
+        if self.start_time_map:
+            self._reschedule_shard_tasks(shard_id)
 
     async def cog_after_invoke(self, ctx):
-        self._serialize_guild_map()
-        self._backup_serialize_guild_map()
-        self._reschedule_tasks(ctx.guild.id)
+        with tracing.span('reminders after invoke'):
+            self._serialize_guild_map()
+            self._reschedule_tasks(ctx.guild.id)
 
     async def _update_task(self):
         self.logger.info(f'Updating reminder tasks.')
-        self._generate_contest_cache()
+        # Schedule from the contests at hand, however stale, before fetching
+        # newer ones so a slow or failing clist delays no reminders.
+        try:
+            self._update_contests()
+        except Exception:
+            # A torn contests file is refetched by the revalidation.
+            self.logger.exception('Could not schedule cached contests')
+        await self._revalidate_contests()
+
+    def _update_contests(self):
+        with tracing.span('update parse'):
+            self._generate_contest_cache()
+        with tracing.span('update filter'):
+            self._partition_contests(clock.utcnow())
+        with tracing.span('update archive'):
+            self._archive_finished_contests()
+        with tracing.span('update schedule'):
+            self._reschedule_all_tasks()
+
+    async def _revalidate_contests(self):
+        try:
+            with tracing.span('update fetch'):
+                # The fetch carries on in its executor thread if this
+                # gives up, but the next update runs on time.
+                refreshed = await asyncio.wait_for(
+                    clist.refresh(), _CONTEST_FETCH_TIMEOUT)
+        except clist.ClistApiError as e:
+            self.logger.warning(f'Keeping cached contests: {e}')
+            return
+        except asyncio.TimeoutError:
+            self.logger.warning('Keeping cached contests: clist fetch took '
+                                f'over {_CONTEST_FETCH_TIMEOUT}s')
+            return
+        if refreshed:
+            self._update_contests()
+
+    def _partition_contests(self, current_time):
         contest_cache = self.contest_cache
-        current_time = dt.datetime.utcnow()
 
         self.future_contests = [
             contest for contest in contest_cache
@@ -225,69 +540,303 @@ class Reminders(commands.Cog):
             self.finished_contests[:_FINISHED_CONTESTS_LIMIT]
         self.start_time_map.clear()
         for contest in self.future_contests:
-            self.start_time_map[time.mktime(
-                contest.start_time.timetuple())].append(contest)
-        self._reschedule_all_tasks()
-        await asyncio.sleep(_CONTEST_REFRESH_PERIOD)
-        asyncio.create_task(self._update_task())
+            # Start times are naive UTC; send times compare with
+            # `clock.timestamp()`, so both must be UTC epoch seconds.
+            self.start_time_map[calendar.timegm(
+                contest.start_time.utctimetuple())].append(contest)
+
+    def _archive_finished_contests(self):
+        # Workers see the same contests as the fetcher, which archives them.
+        if constants.CONTEST_FEED_ROLE == contest_feed.WORKER:
+            return
+        current_time = clock.utcnow()
+        finished = [contest for contest in self.contest_cache
+                    if contest.start_time + contest.duration < current_time
+                    and contest.id not in self.archived_contest_ids]
+        if not finished:
+            return
+        self.contest_archive.add(finished)
+        self.archived_contest_ids.update(
+            contest.id for contest in finished)
 
-    def _generate_contest_cache(self):
-        clist.cache(forced=False)
+    def _load_contest_objects(self):
+        if constants.CONTEST_FEED_ROLE == contest_feed.WORKER:
+            return self.contest_feed.read()
         db_file = Path(constants.CONTESTS_DB_FILE_PATH)
-        with db_file.open() as f:
-            data = json.load(f)
-        contests = [Round(contest) for contest in data['objects']]
-        self.contest_cache = [
-            contest for contest in contests if contest.is_desired(
-                _WEBSITE_ALLOWED_PATTERNS,
-                _WEBSITE_DISALLOWED_PATTERNS)]
+        try:
+            with db_file.open() as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        return data['objects']
+
+    def _generate_contest_cache(self):
+        objects = self._load_contest_objects()
+        if objects is None:
+            # Nothing newer was published; keep the contests we have.
+            if self.contest_cache is None:
+                self.contest_cache = []
+            return
+        contests = []
+        for contest in map(Round, objects):
+            judge = judges.lookup(contest.website_id, contest.website)
+            if judge is None:
+                continue
+            # Settings refer to judges by their registry name.
+            contest.website = judge.name
+            if contest.is_desired(_DEFAULT_ALLOWED_PATTERNS,
+                                  _DEFAULT_DISALLOWED_PATTERNS):
+                contests.append(contest)
+        self.contest_cache = contests
+        self.contest_version += 1
+        self.contest_index.update(self.contest_cache)
 
     def get_guild_contests(self, contests, guild_id):
         settings = self.guild_map[guild_id]
-        _, _, _, _, website_allowed_patterns, website_disallowed_patterns = \
-            settings
+        website_allowed_patterns = settings.website_allowed_patterns.merged()
+        website_disallowed_patterns = \
+            settings.website_disallowed_patterns.merged()
         contests = [contest for contest in contests if contest.is_desired(
             website_allowed_patterns, website_disallowed_patterns)]
         return contests
 
     def _reschedule_all_tasks(self):
+        # Tasks of send times that are still due are kept and pick up the
+        # rebuilt index when they fire.
+        self.reminder_index.clear()
+        oldest = clock.timestamp() - _LATE_REMINDER_GRACE
+        self.prepared_send_times = {
+            send_time for send_time in self.prepared_send_times
+            if send_time >= oldest}
+        for guild in self.bot.guilds:
+            self._index_guild_reminders(guild.id)
+        self._load_user_map()
+        self._index_dm_reminders()
+        self.last_reschedule = self._sync_send_time_tasks()
+        started, cancelled = self.last_reschedule
+        self.logger.info(f'{len(self.send_time_tasks)} reminder tasks '
+                         f'scheduled for {len(self.bot.guilds)} guilds '
+                         f'({started} started, {cancelled} cancelled)')
+
+    def _reschedule_shard_tasks(self, shard_id):
         for guild in self.bot.guilds:
-            self._reschedule_tasks(guild.id)
+            if guild.shard_id == shard_id:
+                self._reschedule_tasks(guild.id)
 
     def _reschedule_tasks(self, guild_id):
-        for task in self.task_map[guild_id]:
-            task.cancel()
-        self.task_map[guild_id].clear()
-        self.logger.info(f'Tasks for guild {guild_id} cleared')
+        self._unindex_reminders(guild_id)
+        self._index_guild_reminders(guild_id)
+        self._sync_send_time_tasks()
+
+    def _unindex_reminders(self, owner):
+        for reminders in self.reminder_index.values():
+            reminders.pop(owner, None)
+
+    def _index_reminder(self, owner, send_time, reminder):
+        # A reminder only just due may still be waiting for its task to
+        # run; one already prepared is out of the index for good.
+        if send_time < clock.timestamp() - _LATE_REMINDER_GRACE \
+                or send_time in self.prepared_send_times:
+            return
+        self.reminder_index[send_time].setdefault(owner, []).append(reminder)
+
+    def _index_guild_reminders(self, guild_id):
         if not self.start_time_map:
             return
         settings = self.guild_map[guild_id]
-        if any(setting is None for setting in settings):
+        guild = self.bot.get_guild(guild_id)
+        destinations = []
+        if None not in (settings.channel_id, settings.role_id,
+                        settings.before):
+            destinations.append((settings.channel_id, settings.role_id,
+                                 None, settings.before))
+        destinations.extend(settings.profiles)
+        if guild is None or not destinations:
             return
-        channel_id, role_id, before, localtimezone, \
-            website_allowed_patterns, website_disallowed_patterns = settings
 
-        guild = self.bot.get_guild(guild_id)
-        channel, role = guild.get_channel(channel_id), guild.get_role(role_id)
         for start_time, contests in self.start_time_map.items():
+            # Filter once per guild; profiles only narrow down by website.
             contests = self.get_guild_contests(contests, guild_id)
             if not contests:
                 continue
-            for before_mins in before:
-                before_secs = 60 * before_mins
-                task = asyncio.create_task(
-                    _send_reminder_at(
-                        channel,
-                        role,
-                        contests,
-                        before_secs,
-                        start_time -
-                        before_secs, localtimezone)
-                )
-                self.task_map[guild_id].append(task)
-        self.logger.info(
-            f'{len(self.task_map[guild_id])} '
-            f'tasks scheduled for guild {guild_id}')
+            for channel_id, role_id, websites, before in destinations:
+                if websites is not None:
+                    profile_contests = [contest for contest in contests
+                                        if contest.website in websites]
+                    if not profile_contests:
+                        continue
+                else:
+                    profile_contests = contests
+                channel = guild.get_channel(channel_id)
+                role = guild.get_role(role_id)
+                if channel is None or role is None:
+                    continue
+                for before_mins in before:
+                    before_secs = 60 * before_mins
+                    self._index_reminder(
+                        guild_id, start_time - before_secs,
+                        Reminder(channel, role, None, profile_contests,
+                                 before_secs, settings.localtimezone))
+
+    def _sync_send_time_tasks(self):
+        """Starts a task for every new send time in the index or outbox and
+        cancels those of send times left without reminders. Returns how
+        many tasks were (started, cancelled)."""
+        for send_time, reminders in list(self.reminder_index.items()):
+            if not reminders:
+                del self.reminder_index[send_time]
+        cancelled = 0
+        for send_time in list(self.send_time_tasks):
+            if send_time not in self.reminder_index and \
+                    send_time not in self.outbox:
+                self.send_time_tasks.pop(send_time).cancel()
+                cancelled += 1
+        started = 0
+        for send_time in itertools.chain(self.reminder_index, self.outbox):
+            if send_time not in self.send_time_tasks:
+                self.send_time_tasks[send_time] = asyncio.create_task(
+                    self._send_reminders_at(send_time))
+                started += 1
+        return started, cancelled
+
+    async def _send_reminders_at(self, send_time):
+        # Render everything ahead of time so that at `send_time` only the
+        # requests are left to make.
+        prepare_time = send_time - constants.REMINDER_PREPARE_LEAD
+        await asyncio.sleep(max(0, prepare_time - clock.timestamp()))
+        if send_time not in self.prepared_send_times:
+            self._prepare_reminders(send_time)
+        await asyncio.sleep(max(0, send_time - clock.timestamp()))
+        self.send_time_tasks.pop(send_time, None)
+        payloads = self.outbox.pop(send_time, ())
+        sends = []
+        for payload in payloads:
+            if payload.channel is not None:
+                sends.append(self._deliver(payload, send_time))
+            else:
+                self.dm_pipeline.submit(
+                    payload.user_ids, embed=payload.embed,
+                    on_result=functools.partial(
+                        self._record_dm, payload.contest_ids, send_time))
+                self.delivery_log.record(
+                    0, 0, payload.contest_ids, send_time, clock.timestamp(),
+                    delivery_log.DM_QUEUED, len(payload.user_ids))
+        results = await asyncio.gather(*sends, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.warning(f'Failed to send reminder: {result!r}')
+
+    def _prepare_reminders(self, send_time):
+        """Moves the reminders due at `send_time` from the index to the
+        outbox as ready-to-send payloads."""
+        self.prepared_send_times.add(send_time)
+        reminders = self.reminder_index.pop(send_time, {})
+        # Guilds and audiences sharing contests, offset and timezone share
+        # one rendered embed.
+        embeds = {}
+        payloads = []
+        for owner_reminders in reminders.values():
+            for reminder in owner_reminders:
+                key = (tuple(contest.id for contest in reminder.contests),
+                       reminder.before_secs, str(reminder.localtimezone))
+                if key not in embeds:
+                    embeds[key] = _make_reminder_embed(
+                        reminder.contests, reminder.before_secs,
+                        reminder.localtimezone)
+                if reminder.audience is None:
+                    payloads.append(Payload(
+                        reminder.channel, reminder.role.mention,
+                        embeds[key], None, key[0]))
+                else:
+                    user_ids = tuple(
+                        self.dm_audiences.get(reminder.audience, ()))
+                    payloads.append(Payload(None, None, embeds[key],
+                                            user_ids, key[0]))
+        self.outbox[send_time] = payloads
+
+    async def _deliver(self, payload, send_time):
+        error = None
+        try:
+            await payload.channel.send(payload.content, embed=payload.embed)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            sent_time = clock.timestamp()
+            channel = payload.channel
+            self.delivery_log.record(
+                channel.guild.id, channel.id, payload.contest_ids, send_time,
+                sent_time, delivery_log.outcome_of(error))
+        self.delivery_lateness.append(sent_time - send_time)
+
+    def _record_dm(self, contest_ids, send_time, user_id, error):
+        self.delivery_log.record(0, user_id, contest_ids, send_time,
+                                 clock.timestamp(),
+                                 delivery_log.outcome_of(error))
+
+    async def _flush_delivery_log(self):
+        await self.delivery_log.flush()
+
+    @staticmethod
+    def _sends_dms():
+        # DMs go through shard 0, so with shards split over processes only
+        # the process running it sends them.
+        return constants.SHARD_IDS is None or 0 in constants.SHARD_IDS
+
+    def _load_user_map(self):
+        """Reloads the DM subscriptions if the file changed, which happens
+        when other processes of a sharded bot change them."""
+        user_map_path = Path(constants.USER_SETTINGS_MAP_PATH)
+        try:
+            mtime = user_map_path.stat().st_mtime_ns
+            if mtime == self.user_map_mtime:
+                return
+            with user_map_path.open('rb') as user_map_file:
+                self._set_user_map(pickle.load(user_map_file), mtime)
+        except FileNotFoundError:
+            pass
+
+    def _set_user_map(self, user_map, mtime):
+        self.user_map = user_map
+        self.user_map_mtime = mtime
+        self.dm_audiences.clear()
+        for user_id, settings in user_map.items():
+            websites = frozenset(settings.websites or judges.names())
+            for before_mins in settings.before:
+                self.dm_audiences[websites, before_mins].add(user_id)
+
+    def _update_user_settings(self, user_id, settings):
+        """Stores (or with None, removes) the DM subscription of a user."""
+        user_map_path = Path(constants.USER_SETTINGS_MAP_PATH)
+        with files.locked(user_map_path):
+            try:
+                with user_map_path.open('rb') as user_map_file:
+                    user_map = pickle.load(user_map_file)
+            except FileNotFoundError:
+                user_map = {}
+            if settings is None:
+                user_map.pop(user_id, None)
+            else:
+                user_map[user_id] = settings
+            files.atomic_write(user_map_path, pickle.dumps(user_map))
+            self._set_user_map(user_map, user_map_path.stat().st_mtime_ns)
+        self._unindex_reminders(_DM_OWNER)
+        self._index_dm_reminders()
+        self._sync_send_time_tasks()
+
+    def _index_dm_reminders(self):
+        if not self._sends_dms():
+            return
+        for start_time, contests in self.start_time_map.items():
+            for audience, user_ids in self.dm_audiences.items():
+                websites, before_mins = audience
+                matching = [contest for contest in contests
+                            if contest.website in websites]
+                if user_ids and matching:
+                    self._index_reminder(
+                        _DM_OWNER, start_time - 60 * before_mins,
+                        Reminder(None, None, audience, matching,
+                                 60 * before_mins, timezones.get('UTC')))
 
     @staticmethod
     def _make_contest_pages(contests, title, localtimezone):
@@ -317,23 +866,52 @@ class Reminders(commands.Cog):
             set_pagenum_footers=True
         )
 
+    @staticmethod
+    def _owns_guild(guild_id):
+        if constants.SHARD_IDS is None:
+            return True
+        return (guild_id >> 22) % constants.SHARD_COUNT in constants.SHARD_IDS
+
     def _serialize_guild_map(self):
         out_path = Path(constants.GUILD_SETTINGS_MAP_PATH)
-        with out_path.open(mode='wb') as out_file:
-            pickle.dump(self.guild_map, out_file)
+        if constants.SHARD_IDS is None:
+            with out_path.open(mode='wb') as out_file:
+                pickle.dump(dict(self.guild_map), out_file)
+            return
 
-    def _backup_serialize_guild_map(self):
-        current_time_stamp = int(dt.datetime.utcnow().timestamp())
-        if current_time_stamp - self.last_guild_backup_time \
-                < _GUILD_SETTINGS_BACKUP_PERIOD:
+        # Other processes own the remaining shards, so only replace the
+        # entries of this process' guilds and keep the rest of the file.
+        with files.locked(out_path):
+            try:
+                with out_path.open('rb') as in_file:
+                    saved_map = pickle.load(in_file)
+            except FileNotFoundError:
+                saved_map = {}
+            guild_map = {guild_id: settings
+                         for guild_id, settings in saved_map.items()
+                         if not self._owns_guild(guild_id)}
+            guild_map.update((guild_id, settings)
+                             for guild_id, settings in self.guild_map.items()
+                             if self._owns_guild(guild_id))
+            files.atomic_write(out_path, pickle.dumps(guild_map))
+
+    async def _backup_serialize_guild_map(self):
+        try:
+            modified = os.path.getmtime(constants.GUILD_SETTINGS_MAP_PATH)
+        except FileNotFoundError:
             return
-        self.last_guild_backup_time = current_time_stamp
+        if modified <= self.last_guild_backup_time:
+            # Unchanged since the last backup.
+            return
+        current_time_stamp = int(clock.utcnow().timestamp())
+        self.last_guild_backup_time = modified
         out_path = Path(
             constants.GUILD_SETTINGS_MAP_PATH +
             "_" +
             str(current_time_stamp))
-        with out_path.open(mode='wb') as out_file:
-            pickle.dump(self.guild_map, out_file)
+        # Copy the settings file rather than this process' map, which only
+        # holds current settings for its own shards when sharded.
+        shutil.copyfile(constants.GUILD_SETTINGS_MAP_PATH, out_path)
 
     @commands.group(brief='Commands for contest reminders',
                     invoke_without_command=True)
@@ -356,9 +934,10 @@ class Reminders(commands.Cog):
             raise RemindersCogError('Please provide valid `before` values')
         before = list(before)
         before = sorted(before, reverse=True)
-        self.guild_map[ctx.guild.id].role_id = role.id
-        self.guild_map[ctx.guild.id].before = before
-        self.guild_map[ctx.guild.id].channel_id = ctx.channel.id
+        settings = self.guild_map.edit(ctx.guild.id)
+        settings.role_id = role.id
+        settings.before = before
+        settings.channel_id = ctx.channel.id
         await ctx.send(
             embed=discord_common.embed_success(
                 'Reminder settings saved successfully'))
@@ -368,13 +947,9 @@ class Reminders(commands.Cog):
     async def reset_judges_settings(self, ctx):
         """ Resets the judges settings to the default ones.
         """
-        _, _, _, _, \
-            default_allowed_patterns, default_disallowed_patterns = \
-            get_default_guild_settings()
-        self.guild_map[ctx.guild.id].website_allowed_patterns = \
-            default_allowed_patterns
-        self.guild_map[ctx.guild.id].website_disallowed_patterns = \
-            default_disallowed_patterns
+        settings = self.guild_map.edit(ctx.guild.id)
+        settings.website_allowed_patterns = judges.AllowedPatterns()
+        settings.website_disallowed_patterns = judges.DisallowedPatterns()
         await ctx.send(embed=discord_common.embed_success(
             'Succesfully reset the judges settings to the default ones'))
 
@@ -382,8 +957,9 @@ class Reminders(commands.Cog):
     async def settings(self, ctx):
         """Shows the reminders role, channel, times, and timezone settings."""
         settings = self.guild_map[ctx.guild.id]
-        channel_id, role_id, before, timezone, \
-            website_allowed_patterns, website_disallowed_patterns = settings
+        channel_id, role_id, before = \
+            settings.channel_id, settings.role_id, settings.before
+        website_allowed_patterns = settings.website_allowed_patterns
         channel = ctx.guild.get_channel(channel_id)
         role = ctx.guild.get_role(role_id)
         if channel is None:
@@ -394,8 +970,8 @@ class Reminders(commands.Cog):
             raise RemindersCogError('No reminder_times set for reminders')
 
         subscribed_websites_str = ", ".join(
-            website for website,
-            patterns in website_allowed_patterns.items() if patterns)
+            website for website in judges.names()
+            if website_allowed_patterns[website])
 
         before_str = ', '.join(str(before_mins) for before_mins in before)
         embed = discord_common.embed_success('Current reminder settings')
@@ -407,9 +983,83 @@ class Reminders(commands.Cog):
                         value=f'{subscribed_websites_str}')
         await ctx.send(embed=embed)
 
+    @remind.group(brief='Commands for more reminder channels',
+                  invoke_without_command=True)
+    async def profile(self, ctx):
+        await ctx.send_help(ctx.command)
+
+    @profile.command(name='add', brief='Add a reminder channel for websites')
+    @commands.has_any_role('Admin', constants.REMIND_MODERATOR_ROLE)
+    async def profile_add(self, ctx, role: discord.Role, websites: str,
+                          *before: int):
+        """Also sends reminders for contests of the given comma separated
+        websites to the current channel, mentioning the given role, the
+        given numbers of minutes before contests.
+
+        e.g t;remind profile add @AtCoder atcoder.jp,codechef.com 10 60
+        """
+        if not role.mentionable:
+            raise RemindersCogError(
+                'The role for reminders must be mentionable')
+        if not before or any(before_mins < 0 for before_mins in before):
+            raise RemindersCogError('Please provide valid `before` values')
+        websites = tuple(website.strip() for website in websites.split(',')
+                         if website.strip())
+        unsupported = [website for website in websites
+                       if judges.get(website) is None]
+        if not websites or unsupported:
+            supported_websites = ", ".join(judges.names())
+            raise RemindersCogError(
+                f'Unsupported websites: {", ".join(unsupported)}'
+                f'\nSupported websites -\n {supported_websites}.')
+        settings = self.guild_map.edit(ctx.guild.id)
+        if len(settings.profiles) >= _MAX_REMINDER_PROFILES:
+            raise RemindersCogError(
+                f'At most {_MAX_REMINDER_PROFILES} profiles are allowed')
+        profile = ReminderProfile(ctx.channel.id, role.id, websites,
+                                  tuple(sorted(set(before), reverse=True)))
+        settings.profiles = settings.profiles + (profile,)
+        await ctx.send(embed=discord_common.embed_success(
+            f'Reminder profile {len(settings.profiles)} saved successfully'))
+
+    @profile.command(name='remove', brief='Remove a reminder profile')
+    @commands.has_any_role('Admin', constants.REMIND_MODERATOR_ROLE)
+    async def profile_remove(self, ctx, number: int):
+        """Removes the reminder profile with the given number, as shown by
+        `t;remind profile list`."""
+        settings = self.guild_map[ctx.guild.id]
+        if not 1 <= number <= len(settings.profiles):
+            raise RemindersCogError(f'No reminder profile {number}')
+        settings = self.guild_map.edit(ctx.guild.id)
+        settings.profiles = (settings.profiles[:number - 1] +
+                             settings.profiles[number:])
+        await ctx.send(embed=discord_common.embed_success(
+            f'Reminder profile {number} removed'))
+
+    @profile.command(name='list', brief='Show the reminder profiles')
+    async def profile_list(self, ctx):
+        """Shows the additional reminder channels of the server."""
+        profiles = self.guild_map[ctx.guild.id].profiles
+        if not profiles:
+            raise RemindersCogError('No reminder profiles set')
+        embed = discord_common.embed_success('Reminder profiles')
+        for number, profile in enumerate(profiles, start=1):
+            channel = ctx.guild.get_channel(profile.channel_id)
+            role = ctx.guild.get_role(profile.role_id)
+            before_str = ', '.join(str(before_mins)
+                                   for before_mins in profile.before)
+            embed.add_field(
+                name=f'Profile {number}',
+                value=(f'{channel.mention if channel else "Deleted channel"}'
+                       f' | {role.mention if role else "Deleted role"}\n'
+                       f'{", ".join(profile.websites)}\n'
+                       f'At {before_str} mins before contest'),
+                inline=False)
+        await ctx.send(embed=embed)
+
     def _get_remind_role(self, guild):
         settings = self.guild_map[guild.id]
-        _, role_id, _, _, _, _ = settings
+        role_id = settings.role_id
         if role_id is None:
             raise RemindersCogError('No role set for reminders')
         role = guild.get_role(role_id)
@@ -455,10 +1105,10 @@ class Reminders(commands.Cog):
             allowed_patterns,
             disallowed_patterns):
 
-        guild_settings = self.guild_map[guild_id]
+        guild_settings = self.guild_map.edit(guild_id)
         supported_websites, unsupported_websites = [], []
         for website in websites:
-            if website not in _SUPPORTED_WEBSITES:
+            if judges.get(website) is None:
                 unsupported_websites.append(website)
                 continue
 
@@ -468,7 +1118,6 @@ class Reminders(commands.Cog):
                 disallowed_patterns[website]
             supported_websites.append(website)
 
-        self.guild_map[guild_id] = guild_settings
         return supported_websites, unsupported_websites
 
     @remind.command(brief='Start contest reminders from websites.')
@@ -476,16 +1125,16 @@ class Reminders(commands.Cog):
     async def subscribe(self, ctx, *websites: str):
         """Start contest reminders from websites."""
 
-        if all(website not in _SUPPORTED_WEBSITES for website in websites):
-            supported_websites = ", ".join(_SUPPORTED_WEBSITES)
+        if all(judges.get(website) is None for website in websites):
+            supported_websites = ", ".join(judges.names())
             embed = discord_common.embed_alert(
                 f'None of these websites are supported for contest reminders.'
                 f'\nSupported websites -\n {supported_websites}.')
         else:
             guild_id = ctx.guild.id
             subscribed, unsupported = self._set_guild_setting(
-                guild_id, websites, _WEBSITE_ALLOWED_PATTERNS,
-                _WEBSITE_DISALLOWED_PATTERNS)
+                guild_id, websites, _DEFAULT_ALLOWED_PATTERNS,
+                _DEFAULT_DISALLOWED_PATTERNS)
             subscribed_websites_str = ", ".join(subscribed)
             unsupported_websites_str = ", ".join(unsupported)
             success_str = f'Successfully subscribed from \
@@ -501,8 +1150,8 @@ class Reminders(commands.Cog):
     async def unsubscribe(self, ctx, *websites: str):
         """Stop contest reminders from websites."""
 
-        if all(website not in _SUPPORTED_WEBSITES for website in websites):
-            supported_websites = ", ".join(_SUPPORTED_WEBSITES)
+        if all(judges.get(website) is None for website in websites):
+            supported_websites = ", ".join(judges.names())
             embed = discord_common.embed_alert(
                 f'None of these websites are supported for contest reminders.'
                 f'\nSupported websites -\n {supported_websites}.')
@@ -521,10 +1170,102 @@ class Reminders(commands.Cog):
             embed = discord_common.embed_success(success_str)
         await ctx.send(embed=embed)
 
+    @remind.group(name='me', brief='Commands for reminders by DM',
+                  invoke_without_command=True)
+    async def remind_me(self, ctx):
+        await ctx.send_help(ctx.command)
+
+    def _get_user_settings(self, user_id):
+        settings = self.user_map.get(user_id)
+        return UserSettings(**settings._asdict()) if settings else None
+
+    @remind_me.command(name='before', brief='Get contest reminders by DM')
+    async def remind_me_before(self, ctx, *before: int):
+        """Sends you contest reminders by DM the given numbers of minutes
+        before contests start.
+
+        e.g t;remind me before 10 60
+        """
+        if not before or any(before_mins < 0 for before_mins in before):
+            raise RemindersCogError('Please provide valid `before` values')
+        settings = self._get_user_settings(ctx.author.id) or UserSettings()
+        settings.before = sorted(set(before), reverse=True)
+        self._update_user_settings(ctx.author.id, settings)
+        await ctx.send(embed=discord_common.embed_success(
+            'You will get contest reminders by DM'))
+
+    def _set_user_websites(self, user_id, websites, subscribe):
+        unsupported = [website for website in websites
+                       if judges.get(website) is None]
+        if not websites or len(unsupported) == len(websites):
+            supported_websites = ", ".join(judges.names())
+            raise RemindersCogError(
+                f'None of these websites are supported for contest reminders.'
+                f'\nSupported websites -\n {supported_websites}.')
+        settings = self._get_user_settings(user_id)
+        if settings is None:
+            raise RemindersCogError(
+                'Set when to be reminded first with `t;remind me before`')
+        current = set(settings.websites or judges.names())
+        changed = set(websites) - set(unsupported)
+        current = current | changed if subscribe else current - changed
+        if not current:
+            raise RemindersCogError(
+                'Use `t;remind me stop` to stop all reminders by DM')
+        settings.websites = sorted(current)
+        self._update_user_settings(user_id, settings)
+        return sorted(changed), unsupported
+
+    @remind_me.command(name='subscribe',
+                       brief='Get DM reminders for contests of websites')
+    async def remind_me_subscribe(self, ctx, *websites: str):
+        """Adds websites to your reminders by DM."""
+        subscribed, unsupported = self._set_user_websites(
+            ctx.author.id, websites, subscribe=True)
+        desc = f'Subscribed to {", ".join(subscribed)} by DM.'
+        if unsupported:
+            desc += f'\nNot supported: {", ".join(unsupported)}'
+        await ctx.send(embed=discord_common.embed_success(desc))
+
+    @remind_me.command(name='unsubscribe',
+                       brief='Stop DM reminders for contests of websites')
+    async def remind_me_unsubscribe(self, ctx, *websites: str):
+        """Removes websites from your reminders by DM."""
+        unsubscribed, unsupported = self._set_user_websites(
+            ctx.author.id, websites, subscribe=False)
+        desc = f'Unsubscribed from {", ".join(unsubscribed)} by DM.'
+        if unsupported:
+            desc += f'\nNot supported: {", ".join(unsupported)}'
+        await ctx.send(embed=discord_common.embed_success(desc))
+
+    @remind_me.command(name='settings', brief='Show your DM reminder settings')
+    async def remind_me_settings(self, ctx):
+        """Shows when and for which websites you get reminders by DM."""
+        settings = self.user_map.get(ctx.author.id)
+        if settings is None:
+            raise RemindersCogError('You do not get reminders by DM')
+        before_str = ', '.join(str(before_mins)
+                               for before_mins in settings.before)
+        websites_str = ', '.join(settings.websites or judges.names())
+        embed = discord_common.embed_success('Your DM reminder settings')
+        embed.add_field(name='Before',
+                        value=f'At {before_str} mins before contest')
+        embed.add_field(name='Subscribed websites', value=websites_str)
+        await ctx.send(embed=embed)
+
+    @remind_me.command(name='stop', brief='Stop all reminders by DM')
+    async def remind_me_stop(self, ctx):
+        """Stops all your reminders by DM."""
+        if ctx.author.id not in self.user_map:
+            raise RemindersCogError('You do not get reminders by DM')
+        self._update_user_settings(ctx.author.id, None)
+        await ctx.send(embed=discord_common.embed_success(
+            'You will no longer get reminders by DM'))
+
     @remind.command(brief='Clear all reminder settings')
     @commands.has_any_role('Admin', constants.REMIND_MODERATOR_ROLE)
     async def clear(self, ctx):
-        del self.guild_map[ctx.guild.id]
+        self.guild_map.pop(ctx.guild.id, None)
         await ctx.send(
             embed=discord_common.embed_success('Reminder settings cleared'))
 
@@ -534,14 +1275,15 @@ class Reminders(commands.Cog):
     async def settz(self, ctx, timezone: str):
         """Sets the server's timezone to the given timezone.
         """
-        if not (timezone in pytz.all_timezones):
+        if not timezones.is_valid(timezone):
             desc = ('The given timezone is invalid\n\n'
                     'Examples of valid timezones:\n\n')
-            desc += '\n'.join(random.sample(pytz.all_timezones, 5))
+            desc += '\n'.join(random.sample(timezones.all_names(), 5))
             desc += '\n\nAll valid timezones can be found [here]'
-            desc += f'({_PYTZ_TIMEZONES_GIST_URL})'
+            desc += f'({_TIMEZONES_GIST_URL})'
             raise RemindersCogError(desc)
-        self.guild_map[ctx.guild.id].localtimezone = pytz.timezone(timezone)
+        self.guild_map.edit(ctx.guild.id).localtimezone = \
+            timezones.get(timezone)
         await ctx.send(embed=discord_common.embed_success(
             f'Succesfully set the server timezone to {timezone}'))
 
@@ -568,14 +1310,72 @@ class Reminders(commands.Cog):
                                       empty_msg='No contests currently active'
                                       )
 
-    @clist.command(brief='List recent finished contests')
-    async def finished(self, ctx):
-        """List recently concluded contests."""
+    @clist.command(brief='List recent finished contests',
+                   usage='[--since YYYY-MM-DD]')
+    async def finished(self, ctx, *args: str):
+        """List recently concluded contests, or every archived contest that
+        started since the given date in the server timezone.
+        e.g t;clist finished --since 2021-05-01"""
+        if not args:
+            contests = self.get_guild_contests(
+                self.finished_contests, ctx.guild.id)
+            await self._send_contest_list(
+                ctx, contests, title='Recently finished contests',
+                empty_msg='No finished contests found')
+            return
+        if len(args) != 2 or args[0] != '--since':
+            raise RemindersCogError('Usage: `t;clist finished --since '
+                                    'YYYY-MM-DD`')
+        localtimezone = self.guild_map[ctx.guild.id].localtimezone
+        since = _parse_search_date(args[1], localtimezone)
+        contests = self.get_guild_contests(
+            self.contest_archive.scan(since), ctx.guild.id)
+        contests.reverse()
+        await self._send_contest_list(ctx, contests,
+                                      title=f'Contests since {args[1]}',
+                                      empty_msg='No archived contests found'
+                                      )
+
+    @clist.command(brief='Contests per week by website',
+                   usage='[weeks]')
+    async def stats(self, ctx, weeks: int = _CONTEST_STATS_WEEKS):
+        """Number of archived contests per website in each of the last
+        few weeks, oldest week first."""
+        if not 1 <= weeks <= 52:
+            raise RemindersCogError('Weeks must be between 1 and 52')
+        end = clock.utcnow()
+        counts = self.contest_archive.weekly_counts(
+            end - dt.timedelta(weeks=weeks), end)
+        if not counts:
+            await ctx.send(embed=discord_common.embed_neutral(
+                'No archived contests found'))
+            return
+        width = max(map(len, counts))
+        lines = [f'{"website":<{width}}  total  per week']
+        for website, week_counts in sorted(counts.items()):
+            lines.append(f'{website:<{width}}  {sum(week_counts):>5}  '
+                         f'{" ".join(map(str, week_counts))}')
+        table = '\n'.join(lines)
+        await ctx.send(embed=discord_common.embed_neutral(
+            f'Contests in the last {weeks} weeks\n```\n{table}\n```'))
+
+    @clist.command(brief='Search contests',
+                   usage='[keywords...] [site:website] [from:YYYY-MM-DD] '
+                         '[to:YYYY-MM-DD] [min:duration] [max:duration]')
+    async def search(self, ctx, *terms: str):
+        """Search upcoming contests by name keywords, website, dates in the
+        server timezone and duration (like 90m or 3h).
+        e.g t;clist search div 2 site:codeforces
+            t;clist search from:2021-06-05 to:2021-06-06 max:3h"""
+        if not terms:
+            raise RemindersCogError('Give at least one search term')
+        localtimezone = self.guild_map[ctx.guild.id].localtimezone
+        query = _parse_search_query(terms, localtimezone, clock.utcnow())
         contests = self.get_guild_contests(
-            self.finished_contests, ctx.guild.id)
+            self.contest_index.search(**query), ctx.guild.id)
         await self._send_contest_list(ctx, contests,
-                                      title='Recently finished contests',
-                                      empty_msg='No finished contests found'
+                                      title='Matching contests',
+                                      empty_msg='No matching contests found'
                                       )
 
     @discord_common.send_error_if(RemindersCogError)
@@ -2,10 +2,34 @@ import os
 
 DATA_DIR = 'data'
 LOGS_DIR = 'logs'
+CONTEST_ARCHIVE_DIR = os.path.join(DATA_DIR, 'archive')
+DELIVERY_LOG_DIR = os.path.join(DATA_DIR, 'deliveries')
 CONTESTS_DB_FILE_PATH = os.path.join(DATA_DIR, 'contests.json')
+CONTEST_FEED_PATH = os.path.join(DATA_DIR, 'contests.feed')
 LOG_FILE_PATH = os.path.join(LOGS_DIR, 'remind.log')
 GUILD_SETTINGS_MAP_PATH = os.path.join(DATA_DIR, 'guild_settings_map')
+USER_SETTINGS_MAP_PATH = os.path.join(DATA_DIR, 'user_settings_map')
+# Written on graceful shutdown, consumed by the next start.
+SHUTDOWN_CHECKPOINT_PATH = os.path.join(DATA_DIR, 'shutdown_checkpoint')
+JUDGES_CONFIG_PATH = os.path.join('remind', 'judges.json')
 ALL_DIRS = (attrib_value for attrib_name, attrib_value in list(
     globals().items()) if attrib_name.endswith('DIR'))
 SUPER_USERS = []
 REMIND_MODERATOR_ROLE = "Remind Moderator"
+# Sharding; SHARD_IDS is only set when this process owns a subset of shards.
+SHARD_COUNT = None
+SHARD_IDS = None
+# 'fetcher' publishes contests to CONTEST_FEED_PATH, 'worker' reads them.
+CONTEST_FEED_ROLE = None
+# Seconds before their send time that reminders are rendered.
+REMINDER_PREPARE_LEAD = 60
+# Local HTTP endpoint for calendar feeds, disabled unless a port is set.
+CALENDAR_HOST = '127.0.0.1'
+CALENDAR_PORT = None
+# Public URL the calendar endpoint is reachable at, for `calendar` links.
+CALENDAR_BASE_URL = None
+# Times commands, contest refreshes and event loop lag; see `meta spans`.
+TRACING = False
+# Seconds a callback may block the event loop before its stack is logged;
+# the watchdog is off when unset.
+LOOP_WATCHDOG_THRESHOLD = None
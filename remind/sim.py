@@ -0,0 +1,279 @@
+"""Offline simulation of contest reminders on a virtual clock.
+
+Boots the `Reminders` cog against fake guilds and a local clist stub
+server, then replays the given number of days of reminders in seconds and
+checks every delivery against the reminders that were expected.
+
+    python -m remind.sim --guilds 1000 --days 7
+"""
+import argparse
+import asyncio
+import collections
+import datetime as dt
+import http.server
+import json
+import logging
+import os
+import selectors
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from remind import constants
+from remind.util import clock
+from remind.util import fakes
+from remind.util.rounds import Round
+
+
+class VirtualClock:
+    def __init__(self, start):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Skips the idle waits of the event loop by advancing the clock."""
+
+    def __init__(self, virtual_clock, busy):
+        super().__init__()
+        self._clock = virtual_clock
+        self._busy = busy
+
+    def select(self, timeout=None):
+        if timeout is None or self._busy():
+            # Nothing scheduled, or work running in the executor that will
+            # wake the loop up when done; time must not move meanwhile.
+            return super().select(timeout)
+        events = super().select(0)
+        if not events and timeout > 0:
+            self._clock.advance(timeout)
+        return events
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    def __init__(self, virtual_clock):
+        super().__init__(_VirtualSelector(
+            virtual_clock, lambda: self._executor_jobs > 0))
+        self._virtual_clock = virtual_clock
+        self._executor_jobs = 0
+        # Epoch-sized floats cannot resolve the default nanosecond steps, so
+        # timers a rounding error in the future would never become due.
+        self._clock_resolution = 1e-3
+
+    def time(self):
+        return self._virtual_clock.now
+
+    def run_in_executor(self, executor, func, *args):
+        future = super().run_in_executor(executor, func, *args)
+        self._executor_jobs += 1
+
+        def done(_):
+            self._executor_jobs -= 1
+
+        future.add_done_callback(done)
+        return future
+
+
+def _serve_clist_stub(objects):
+    """Serves `objects` the way the clist contest endpoint does."""
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = urllib.parse.parse_qs(
+                urllib.parse.urlparse(self.path).query)
+            start = query.get('start__gte', [''])[0]
+            limit = int(query.get('limit', ['200'])[0])
+            found = sorted((contest for contest in objects
+                            if contest['start'] >= start),
+                           key=lambda contest: contest['start'])
+            body = json.dumps({'objects': found[:limit]}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _expected_reminders(cog, objects, begin, end):
+    """Maps (guild_id, fire time) to the contest name sets of the reminders
+    due then, derived straight from the guild settings."""
+    from remind.cogs import reminders
+    from remind.util import judges
+
+    rounds = [Round(contest) for contest in objects]
+    rounds = [contest for contest in rounds if contest.is_desired(
+        judges.AllowedPatterns(), judges.DisallowedPatterns())]
+    expected = collections.defaultdict(list)
+    for guild_id, settings in cog.guild_map.items():
+        by_start = collections.defaultdict(set)
+        for contest in rounds:
+            if contest.is_desired(settings.website_allowed_patterns,
+                                  settings.website_disallowed_patterns):
+                start = contest.start_time.replace(
+                    tzinfo=dt.timezone.utc).timestamp()
+                by_start[start].add(contest.name)
+        for start, names in by_start.items():
+            if start <= begin:
+                continue
+            for before_mins in settings.before:
+                fire = start - 60 * before_mins
+                # Reminders that were due just before the start still go out.
+                if begin - reminders._LATE_REMINDER_GRACE <= fire < end:
+                    expected[guild_id, fire].append(names)
+    return expected
+
+
+def _check(guilds, expected):
+    total = sum(map(len, expected.values()))
+    lateness = []
+    delivered = unexpected = wrong = 0
+    for guild in guilds:
+        for sent_at, _, embed in guild.channel.sent:
+            # Reminders target whole minutes, so round off the loop jitter.
+            fire = round(sent_at / 60) * 60
+            due = expected.get((guild.id, fire))
+            if not due:
+                unexpected += 1
+                continue
+            names = {field.name for field in embed.fields}
+            if names in due:
+                due.remove(names)
+            else:
+                # Same slot but other contests; count it against the first.
+                due.pop(0)
+                wrong += 1
+            delivered += 1
+            lateness.append(sent_at - fire)
+    return {
+        'expected': total,
+        'delivered': delivered,
+        'missing': total - delivered,
+        'unexpected': unexpected,
+        'wrong_contests': wrong,
+        'lateness_max_s': max(lateness, default=0.0),
+    }
+
+
+def run(guild_count, contest_count, days, seed):
+    from remind.cogs import reminders
+    from remind.util import clist_api
+
+    begin = float(int(time.time()) // 3600 * 3600)
+    end = begin + days * 24 * 60 * 60
+    virtual_clock = VirtualClock(begin)
+
+    start = dt.datetime.utcfromtimestamp(begin) - dt.timedelta(days=2)
+    objects = fakes.make_clist_objects(
+        contest_count, start=start, span=dt.timedelta(days=days + 4),
+        seed=seed)
+    server = _serve_clist_stub(objects)
+    clist_api.URL_BASE = f'http://127.0.0.1:{server.server_port}/'
+    os.environ.setdefault('CLIST_API_TOKEN', 'username=sim&api_key=sim')
+
+    guilds = fakes.make_guilds(guild_count, clock=virtual_clock)
+    cog = reminders.Reminders(fakes.FakeBot(guilds))
+    fakes.fill_guild_map(cog.guild_map, guilds,
+                         reminders.get_default_guild_settings, seed=seed)
+
+    schedule_costs = []
+    reschedule_all_tasks = cog._reschedule_all_tasks
+
+    def timed_reschedule_all_tasks():
+        started = time.perf_counter()
+        reschedule_all_tasks()
+        schedule_costs.append(time.perf_counter() - started)
+
+    cog._reschedule_all_tasks = timed_reschedule_all_tasks
+
+    async def replay():
+        cog.update_job.start()
+        await asyncio.sleep(end - begin)
+        cog.update_job.stop()
+        pending = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    loop = VirtualTimeLoop(virtual_clock)
+    clock.set_source(virtual_clock)
+    started = time.perf_counter()
+    try:
+        loop.run_until_complete(replay())
+    finally:
+        clock.reset_source()
+        loop.close()
+        server.shutdown()
+    wall = time.perf_counter() - started
+
+    report = _check(guilds, _expected_reminders(cog, objects, begin, end))
+    report.update({
+        'guilds': guild_count,
+        'contests': contest_count,
+        'virtual_days': days,
+        'wall_s': wall,
+        'speedup': (end - begin) / wall,
+        'refreshes': len(schedule_costs),
+        'schedule_mean_ms': 1000 * sum(schedule_costs) /
+        max(1, len(schedule_costs)),
+        'schedule_max_ms': 1000 * max(schedule_costs, default=0.0),
+    })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--guilds', type=int, default=100)
+    parser.add_argument('--contests', type=int, default=150,
+                        help='synthetic contests served by the clist stub')
+    parser.add_argument('--days', type=float, default=7)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tz', default='Asia/Kolkata',
+                        help='host timezone to run under; reminders must '
+                        'not depend on it')
+    parser.add_argument('--verbose', action='store_true',
+                        help='keep the cogs\' INFO logging enabled')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    # Hosts are not always on UTC, so the default is a zone that is not.
+    os.environ['TZ'] = args.tz
+    time.tzset()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        constants.CONTESTS_DB_FILE_PATH = os.path.join(
+            data_dir, 'contests.json')
+        constants.GUILD_SETTINGS_MAP_PATH = os.path.join(
+            data_dir, 'guild_settings_map')
+        constants.USER_SETTINGS_MAP_PATH = os.path.join(
+            data_dir, 'user_settings_map')
+        constants.CONTEST_ARCHIVE_DIR = os.path.join(data_dir, 'archive')
+        constants.DELIVERY_LOG_DIR = os.path.join(data_dir, 'deliveries')
+        constants.SHUTDOWN_CHECKPOINT_PATH = os.path.join(
+            data_dir, 'shutdown_checkpoint')
+        report = run(args.guilds, args.contests, args.days, args.seed)
+
+    width = max(map(len, report))
+    for key, value in report.items():
+        value = f'{value:.3f}' if isinstance(value, float) else value
+        print(f'{key:<{width}}  {value}')
+    failed = (report['missing'] or report['unexpected'] or
+              report['wrong_contests'])
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Startup profile: where the time to import the bot and its cogs goes.
+
+Imports `remind.__main__` and every cog in a fresh interpreter under
+`python -X importtime` and lists the slowest modules.
+
+    python -m remind.startup --top 20
+"""
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+_IMPORT_TIME_PREFIX = 'import time:'
+
+
+def _import_statement():
+    cogs = sorted(file.stem for file in Path('remind', 'cogs').glob('*.py'))
+    modules = ['remind.__main__'] + [f'remind.cogs.{cog}' for cog in cogs]
+    return '; '.join(f'import {module}' for module in modules)
+
+
+def profile():
+    """Returns the wall time of the imports and, per module, its
+    (self, cumulative) import time in microseconds."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _import_statement()],
+        stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    wall = time.perf_counter() - start
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith(_IMPORT_TIME_PREFIX):
+            continue
+        self_us, cumulative_us, name = \
+            line[len(_IMPORT_TIME_PREFIX):].split('|')
+        if not self_us.strip().isdigit():
+            # The header line.
+            continue
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return wall, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    wall, modules = profile()
+    print(f'interpreter + imports: {wall * 1000:.0f} ms, '
+          f'{len(modules)} modules')
+    for title, index in (('cumulative', 1), ('self', 0)):
+        print(f'\nslowest by {title} time')
+        ranked = sorted(modules.items(), key=lambda item: item[1][index],
+                        reverse=True)
+        for name, times in ranked[:args.top]:
+            print(f'{times[index] / 1000:>9.1f} ms  {name}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import threading
+
+from remind.util import clock
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker:
+    """Stops calls to a failing dependency for a while.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    rejects calls for `base_backoff` seconds, doubling on every failed
+    trial call up to `max_backoff`. Once the backoff has passed a single
+    trial call is let through (half-open); its success closes the breaker.
+    """
+
+    def __init__(self, *, failure_threshold=3, base_backoff=60,
+                 max_backoff=60 * 60):
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.backoff = 0
+        self.retry_at = 0
+        self.last_error = None
+        self._trial_running = False
+        # Calls come from executor threads.
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.failures < self.failure_threshold:
+            return CLOSED
+        if clock.timestamp() < self.retry_at:
+            return OPEN
+        return HALF_OPEN
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.backoff = 0
+            self.retry_at = 0
+            self.last_error = None
+            self._trial_running = False
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            self._trial_running = False
+            if self.failures >= self.failure_threshold:
+                self.backoff = min(self.max_backoff,
+                                   max(self.base_backoff, 2 * self.backoff))
+                self.retry_at = clock.timestamp() + self.backoff
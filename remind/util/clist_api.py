@@ -1,10 +1,14 @@
+import asyncio
 import logging
 import os
 import datetime as dt
-import requests
 import json
 
 from remind import constants
+from remind.util import circuit_breaker
+from remind.util import clock
+from remind.util import contest_feed
+from remind.util import files
 from discord.ext import commands
 
 from pathlib import Path
@@ -12,6 +16,14 @@ from pathlib import Path
 logger = logging.getLogger(__name__)
 URL_BASE = 'https://clist.by/api/v1/contest/'
 _CLIST_API_TIME_DIFFERENCE = 30 * 60  # seconds
+# Seconds to connect and to wait for each read. The fetch holds the contests
+# file lock, so a stalled connection must not hold it for long.
+_REQUEST_TIMEOUT = (5, 30)
+
+breaker = circuit_breaker.CircuitBreaker()
+_refresh_lock = None
+# Maps `forced` to the refresh currently running with it.
+_refreshes = {}
 
 
 class ClistApiError(commands.CommandError):
@@ -28,16 +40,26 @@ class ClientError(ClistApiError):
         super().__init__('Error connecting to Clist API')
 
 
+class CircuitOpenError(ClistApiError):
+    """A request to the API skipped after repeated failures."""
+
+    def __init__(self, retry_in):
+        super().__init__(
+            f'Clist API unavailable, next attempt in {int(retry_in)}s')
+
+
 def _query_api():
     clist_token = os.getenv('CLIST_API_TOKEN')
-    contests_start_time = dt.datetime.utcnow() - dt.timedelta(days=2)
+    contests_start_time = clock.utcnow() - dt.timedelta(days=2)
     contests_start_time_string = contests_start_time.strftime(
         "%Y-%m-%dT%H%%3A%M%%3A%S")
     url = URL_BASE + '?limit=200&start__gte=' + \
         contests_start_time_string + '&' + clist_token
 
+    # requests is slow to import and only needed once the cache is stale.
+    import requests
     try:
-        resp = requests.get(url)
+        resp = requests.get(url, timeout=_REQUEST_TIMEOUT)
         if resp.status_code != 200:
             raise ClistApiError
         return resp.json()['objects']
@@ -47,26 +69,74 @@ def _query_api():
 
 
 def cache(forced=False):
+    """Refetches contests unless the cached ones are fresh or `forced`,
+    and returns whether it did.
 
-    current_time_stamp = dt.datetime.utcnow().timestamp()
-    db_file = Path(constants.CONTESTS_DB_FILE_PATH)
+    Blocking; the file lock makes concurrent callers in other processes
+    wait for one fetch and then find a fresh cache."""
+    if constants.CONTEST_FEED_ROLE == contest_feed.WORKER:
+        # Workers get contests from the fetcher's feed, never from clist.
+        return False
 
-    db = None
-    try:
-        with db_file.open() as f:
-            db = json.load(f)
-    except BaseException:
-        pass
-
-    last_time_stamp = db['querytime'] if db and db['querytime'] else 0
-
-    if not forced and current_time_stamp - \
-            last_time_stamp < _CLIST_API_TIME_DIFFERENCE:
-        return
-
-    contests = _query_api()
-    db = {}
-    db['querytime'] = current_time_stamp
-    db['objects'] = contests
-    with open(db_file, 'w') as f:
-        json.dump(db, f)
+    db_file = Path(constants.CONTESTS_DB_FILE_PATH)
+    with files.locked(db_file):
+        current_time_stamp = clock.utcnow().timestamp()
+
+        db = None
+        try:
+            with db_file.open() as f:
+                db = json.load(f)
+        except BaseException:
+            pass
+
+        last_time_stamp = db['querytime'] if db and db['querytime'] else 0
+
+        if not forced and current_time_stamp - \
+                last_time_stamp < _CLIST_API_TIME_DIFFERENCE:
+            # After a restart the cache can be fresh while the feed is
+            # missing or older, which would leave workers without contests.
+            if constants.CONTEST_FEED_ROLE == contest_feed.FETCHER and \
+                    contest_feed.published_querytime() != last_time_stamp:
+                contest_feed.publish(db['objects'], last_time_stamp)
+            return False
+
+        if not breaker.allow():
+            raise CircuitOpenError(breaker.retry_at - current_time_stamp)
+        try:
+            contests = _query_api()
+        except ClistApiError as e:
+            breaker.record_failure(e)
+            raise
+        breaker.record_success()
+        db = {}
+        db['querytime'] = current_time_stamp
+        db['objects'] = contests
+        files.atomic_write(db_file, json.dumps(db).encode())
+        if constants.CONTEST_FEED_ROLE == contest_feed.FETCHER:
+            contest_feed.publish(contests, current_time_stamp)
+        return True
+
+
+def _get_refresh_lock():
+    global _refresh_lock
+    if _refresh_lock is None:
+        _refresh_lock = asyncio.Lock()
+    return _refresh_lock
+
+
+async def _run_refresh(forced):
+    async with _get_refresh_lock():
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, cache, forced)
+
+
+async def refresh(forced=False):
+    """Runs `cache` off the event loop and returns its result. Concurrent
+    callers share a single refresh; an unforced call also settles for a
+    forced one in flight."""
+    task = _refreshes.get(forced) or _refreshes.get(True)
+    if task is None:
+        task = asyncio.ensure_future(_run_refresh(forced))
+        _refreshes[forced] = task
+        task.add_done_callback(lambda _: _refreshes.pop(forced, None))
+    return await asyncio.shield(task)
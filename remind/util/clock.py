@@ -0,0 +1,27 @@
+"""The wall clock used by the contest and reminder code.
+
+Everything that decides *when* something happens reads the time through
+here, so offline runs (see `remind.sim`) can swap in a virtual clock.
+"""
+import datetime as dt
+import time
+
+_source = time.time
+
+
+def set_source(source):
+    """Replaces the time source; `source()` must return epoch seconds."""
+    global _source
+    _source = source
+
+
+def reset_source():
+    set_source(time.time)
+
+
+def timestamp():
+    return _source()
+
+
+def utcnow():
+    return dt.datetime.utcfromtimestamp(_source())
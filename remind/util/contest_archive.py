@@ -0,0 +1,234 @@
+"""Append-only archive of finished contests.
+
+Contests are stored in one segment file per month of their start time. A
+segment holds a small header followed by fixed width little-endian columns
+(id, start, duration, website) that `numpy.frombuffer` can read in place,
+then the website table, names and urls as NUL separated UTF-8.
+"""
+import array
+import bisect
+import collections
+import datetime as dt
+import logging
+import os
+import struct
+import sys
+
+from remind import constants
+from remind.util import files
+from remind.util.rounds import Round
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'RMDARCH1'
+# magic, rows, website table, names and urls lengths in bytes
+_HEADER = struct.Struct('<8sIIII')
+# Column name and array typecode, in file order.
+_COLUMNS = (('ids', 'q'), ('starts', 'q'), ('durations', 'q'),
+            ('websites', 'H'))
+_SEGMENT_SUFFIX = '.seg'
+_EPOCH = dt.datetime(1970, 1, 1)
+_WEEK = 7 * 24 * 60 * 60  # seconds
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def _timestamp(time):
+    return int((time - _EPOCH).total_seconds())
+
+
+def _month(time):
+    return f'{time.year:04}-{time.month:02}'
+
+
+def _join(strings):
+    return '\0'.join(strings).encode()
+
+
+def _split(data):
+    return data.decode().split('\0') if data else []
+
+
+class _Segment:
+    def __init__(self):
+        for name, typecode in _COLUMNS:
+            setattr(self, name, array.array(typecode))
+        # (clist resource id, name) of the websites the column refers to.
+        self.website_table = []
+        self.names = []
+        self.urls = []
+        self.mtime = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, path):
+        segment = cls()
+        with open(path, 'rb') as segment_file:
+            segment.mtime = os.fstat(segment_file.fileno()).st_mtime_ns
+            data = segment_file.read()
+        magic, rows, websites_len, names_len, urls_len = \
+            _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ArchiveError(f'{path} is not an archive segment')
+        offset = _HEADER.size
+        for name, typecode in _COLUMNS:
+            column = getattr(segment, name)
+            size = rows * column.itemsize
+            column.frombytes(data[offset:offset + size])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            offset += size
+        for entry in _split(data[offset:offset + websites_len]):
+            website_id, name = entry.split('\t', 1)
+            segment.website_table.append((int(website_id), name))
+        offset += websites_len
+        segment.names = _split(data[offset:offset + names_len])
+        offset += names_len
+        segment.urls = _split(data[offset:offset + urls_len])
+        return segment
+
+    def dump(self):
+        columns = []
+        for name, _ in _COLUMNS:
+            column = array.array(getattr(self, name).typecode,
+                                 getattr(self, name))
+            if sys.byteorder == 'big':
+                column.byteswap()
+            columns.append(column.tobytes())
+        websites = _join(f'{website_id}\t{name}'
+                         for website_id, name in self.website_table)
+        names = _join(self.names)
+        urls = _join(self.urls)
+        header = _HEADER.pack(_MAGIC, len(self), len(websites), len(names),
+                              len(urls))
+        return b''.join((header, *columns, websites, names, urls))
+
+    def extend(self, contests):
+        """Adds `contests`, keeping the rows sorted by start time."""
+        codes = {website: code
+                 for code, website in enumerate(self.website_table)}
+        rows = list(zip(self.starts, self.ids, self.durations,
+                        self.websites, self.names, self.urls))
+        for contest in contests:
+            website = (contest.website_id, contest.website)
+            if website not in codes:
+                codes[website] = len(self.website_table)
+                self.website_table.append(website)
+            # Names and urls are NUL separated on disk.
+            rows.append((_timestamp(contest.start_time), contest.id,
+                         int(contest.duration.total_seconds()),
+                         codes[website], contest.name.replace('\0', ''),
+                         contest.url.replace('\0', '')))
+        rows.sort()
+        starts, ids, durations, websites, names, urls = zip(*rows)
+        self.starts = array.array('q', starts)
+        self.ids = array.array('q', ids)
+        self.durations = array.array('q', durations)
+        self.websites = array.array('H', websites)
+        self.names = list(names)
+        self.urls = list(urls)
+
+    def round(self, row):
+        website_id, website = self.website_table[self.websites[row]]
+        start = _EPOCH + dt.timedelta(seconds=self.starts[row])
+        return Round({
+            'id': self.ids[row],
+            'event': self.names[row],
+            'start': start.strftime('%Y-%m-%dT%H:%M:%S'),
+            'duration': self.durations[row],
+            'href': self.urls[row],
+            'resource': {'id': website_id, 'name': website},
+        })
+
+
+class ContestArchive:
+    """Finished contests by month, with range scans over start times."""
+
+    def __init__(self, directory=None):
+        self.directory = directory or constants.CONTEST_ARCHIVE_DIR
+        # Maps month to its loaded `_Segment`, reloaded when its file changes.
+        self._segments = {}
+
+    def _path(self, month):
+        return os.path.join(self.directory, month + _SEGMENT_SUFFIX)
+
+    def _months(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(_SEGMENT_SUFFIX)] for name in names
+                      if name.endswith(_SEGMENT_SUFFIX))
+
+    def _segment(self, month):
+        path = self._path(month)
+        segment = self._segments.get(month)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return _Segment()
+        if segment is None or segment.mtime != mtime:
+            segment = self._segments[month] = _Segment.load(path)
+        return segment
+
+    def add(self, contests):
+        """Archives the finished `contests` that are not archived yet and
+        returns how many were added."""
+        by_month = collections.defaultdict(list)
+        for contest in contests:
+            by_month[_month(contest.start_time)].append(contest)
+        os.makedirs(self.directory, exist_ok=True)
+        added = 0
+        for month, month_contests in by_month.items():
+            path = self._path(month)
+            with files.locked(path):
+                segment = self._segment(month)
+                archived = set(segment.ids)
+                new = [contest for contest in month_contests
+                       if contest.id not in archived]
+                if not new:
+                    continue
+                segment.extend(new)
+                files.atomic_write(path, segment.dump())
+                segment.mtime = os.stat(path).st_mtime_ns
+                self._segments[month] = segment
+            added += len(new)
+        if added:
+            logger.info(f'Archived {added} finished contests')
+        return added
+
+    def _rows(self, start, end):
+        """(segment, row) of the contests starting in [start, end)."""
+        first, last = _month(start), _month(end) if end else None
+        start_ts = _timestamp(start)
+        end_ts = _timestamp(end) if end else None
+        for month in self._months():
+            if month < first or (last is not None and month > last):
+                continue
+            segment = self._segment(month)
+            lo = bisect.bisect_left(segment.starts, start_ts)
+            hi = len(segment) if end_ts is None else \
+                bisect.bisect_left(segment.starts, end_ts, lo)
+            for row in range(lo, hi):
+                yield segment, row
+
+    def scan(self, start, end=None):
+        """Archived contests starting in [start, end), oldest first."""
+        return [segment.round(row) for segment, row in self._rows(start, end)]
+
+    def weekly_counts(self, start, end):
+        """Maps website to a list with its number of contests in each week
+        from `start`."""
+        start_ts = _timestamp(start)
+        weeks = -((start_ts - _timestamp(end)) // _WEEK)
+        counts = {}
+        for segment, row in self._rows(start, end):
+            website = segment.website_table[segment.websites[row]][1]
+            if website not in counts:
+                counts[website] = [0] * weeks
+            counts[website][(segment.starts[row] - start_ts) // _WEEK] += 1
+        return counts
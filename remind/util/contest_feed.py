@@ -0,0 +1,94 @@
+"""Contest snapshots shared between bot processes.
+
+One process (the fetcher) queries clist and publishes each snapshot of the
+raw clist objects to a file with a small versioned header; the other
+processes (workers) memory-map the file, check the header and only unpickle
+the payload, which copies it out of the mapping, when the version moved.
+"""
+import logging
+import mmap
+import os
+import pickle
+import struct
+
+from remind import constants
+from remind.util import files
+
+logger = logging.getLogger(__name__)
+
+FETCHER = 'fetcher'
+WORKER = 'worker'
+
+_MAGIC = b'RMDFEED1'
+# magic, version, clist query time, payload length
+_HEADER = struct.Struct('<8sQdQ')
+
+
+class FeedError(Exception):
+    pass
+
+
+def _read_header(buffer):
+    magic, version, querytime, length = _HEADER.unpack_from(buffer)
+    if magic != _MAGIC:
+        raise FeedError('Not a contest feed file')
+    return version, querytime, length
+
+
+def publish(objects, querytime):
+    """Publishes the clist `objects` as the next snapshot version."""
+    path = constants.CONTEST_FEED_PATH
+    with files.locked(path):
+        version = 0
+        try:
+            with open(path, 'rb') as feed_file:
+                version, _, _ = _read_header(feed_file.read(_HEADER.size))
+        except (OSError, struct.error, FeedError):
+            pass
+        payload = pickle.dumps(objects, protocol=pickle.HIGHEST_PROTOCOL)
+        header = _HEADER.pack(_MAGIC, version + 1, querytime, len(payload))
+        files.atomic_write(path, header + payload)
+    logger.info(f'Published contest feed version {version + 1}')
+    return version + 1
+
+
+def published_querytime(path=None):
+    """The clist query time of the published snapshot, or None."""
+    try:
+        with open(path or constants.CONTEST_FEED_PATH, 'rb') as feed_file:
+            _, querytime, _ = _read_header(feed_file.read(_HEADER.size))
+    except (OSError, struct.error, FeedError):
+        return None
+    return querytime
+
+
+class FeedReader:
+    def __init__(self, path=None):
+        self.path = path or constants.CONTEST_FEED_PATH
+        self.version = None
+        self.querytime = None
+        self._inode = None
+
+    def read(self):
+        """Returns the clist objects of the latest snapshot, or None when
+        nothing newer than the last read has been published."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        # Snapshots are swapped in with a rename, so an unchanged inode
+        # means an unchanged snapshot and the file need not be opened.
+        if (stat.st_ino, stat.st_mtime_ns) == self._inode:
+            return None
+        with open(self.path, 'rb') as feed_file, \
+                mmap.mmap(feed_file.fileno(), 0,
+                          access=mmap.ACCESS_READ) as buffer:
+            version, querytime, length = _read_header(buffer)
+            self._inode = stat.st_ino, stat.st_mtime_ns
+            if version == self.version:
+                return None
+            with memoryview(buffer) as view:
+                objects = pickle.loads(
+                    view[_HEADER.size:_HEADER.size + length])
+        self.version, self.querytime = version, querytime
+        return objects
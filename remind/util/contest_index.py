@@ -0,0 +1,127 @@
+"""Inverted index over contest names, websites and start times."""
+import bisect
+import re
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _key(contest):
+    return (contest.name, contest.website, contest.start_time,
+            contest.duration)
+
+
+class ContestIndex:
+    """Keyword, website and start time lookups over a set of contests that
+    `update` keeps in sync incrementally."""
+
+    def __init__(self):
+        # Maps contest id to (`_key`, contest).
+        self.contests = {}
+        # Maps name token to the ids of the contests it appears in.
+        self.postings = {}
+        # Sorted tokens, for prefix lookups.
+        self.vocabulary = []
+        # Maps website to the ids of its contests.
+        self.websites = {}
+        # Sorted (start_time, id) of every contest.
+        self.times = []
+
+    def __len__(self):
+        return len(self.contests)
+
+    def update(self, contests):
+        """Makes the index hold exactly `contests`, touching only the
+        contests that were added, removed or changed."""
+        contests = {contest.id: contest for contest in contests}
+        for contest_id, (key, contest) in list(self.contests.items()):
+            current = contests.get(contest_id)
+            if current is None or _key(current) != key:
+                self._remove(contest)
+            else:
+                # Same contest; keep the newer object for the other fields.
+                self.contests[contest_id] = (key, current)
+        for contest_id, contest in contests.items():
+            if contest_id not in self.contests:
+                self._add(contest)
+
+    def _add(self, contest):
+        self.contests[contest.id] = (_key(contest), contest)
+        for token in set(tokenize(contest.name)):
+            ids = self.postings.get(token)
+            if ids is None:
+                ids = self.postings[token] = set()
+                bisect.insort(self.vocabulary, token)
+            ids.add(contest.id)
+        self.websites.setdefault(contest.website, set()).add(contest.id)
+        bisect.insort(self.times, (contest.start_time, contest.id))
+
+    def _remove(self, contest):
+        del self.contests[contest.id]
+        for token in set(tokenize(contest.name)):
+            ids = self.postings[token]
+            ids.discard(contest.id)
+            if not ids:
+                del self.postings[token]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary,
+                                                       token)]
+        ids = self.websites[contest.website]
+        ids.discard(contest.id)
+        if not ids:
+            del self.websites[contest.website]
+        del self.times[bisect.bisect_left(self.times,
+                                          (contest.start_time, contest.id))]
+
+    def _token_ids(self, prefix):
+        """Ids of the contests with a name token starting with `prefix`.
+        Numbers only match whole, so that '2' does not find 'Round 25'."""
+        if prefix.isdigit():
+            return self.postings.get(prefix, set())
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        ids = set()
+        for token in self.vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            ids |= self.postings[token]
+        return ids
+
+    def _time_ids(self, start, end):
+        lo = 0 if start is None else bisect.bisect_left(self.times,
+                                                        (start,))
+        if end is None:
+            hi = len(self.times)
+        else:
+            hi = bisect.bisect_left(self.times, (end,), lo)
+        return {contest_id for _, contest_id in self.times[lo:hi]}
+
+    def search(self, *, keywords=(), websites=(), start=None, end=None,
+               min_duration=None, max_duration=None):
+        """Contests, sorted by start time, whose names have a token starting
+        with every keyword, hosted on a website containing any of
+        `websites`, starting in [start, end) and lasting within
+        [min_duration, max_duration]."""
+        candidates = []
+        for keyword in keywords:
+            for token in tokenize(keyword):
+                candidates.append(self._token_ids(token))
+        if websites:
+            candidates.append(set().union(*(
+                ids for website, ids in self.websites.items()
+                if any(query in website for query in websites))))
+        if start is not None or end is not None or not candidates:
+            candidates.append(self._time_ids(start, end))
+        candidates.sort(key=len)
+        ids = candidates[0].intersection(*candidates[1:])
+        found = []
+        for contest_id in ids:
+            contest = self.contests[contest_id][1]
+            if min_duration is not None and contest.duration < min_duration:
+                continue
+            if max_duration is not None and contest.duration > max_duration:
+                continue
+            found.append(contest)
+        found.sort(key=lambda contest: (contest.start_time, contest.id))
+        return found
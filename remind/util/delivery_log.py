@@ -0,0 +1,185 @@
+"""Append-only log of reminder deliveries.
+
+Each UTC day of deliveries goes to its own file, and files older than
+`_RETENTION_DAYS` are deleted as new days start. A record is a fixed size
+little-endian header followed by the ids of the contests it reminded of.
+Records are buffered in memory and written off the event loop by `flush`.
+"""
+import asyncio
+import collections
+import contextlib
+import datetime as dt
+import logging
+import os
+import struct
+
+import discord
+
+from remind import constants
+from remind.util import files
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'RMDDLV01'
+# guild id, channel id, scheduled and actual send time, outcome,
+# recipients, contest count
+_RECORD = struct.Struct('<qqddBIH')
+_CONTEST_ID = struct.Struct('<q')
+_LOG_SUFFIX = '.dlv'
+# Permanent, unlike the daily files, so rotation cannot break the lock.
+_LOCK_NAME = 'deliveries'
+_RETENTION_DAYS = 14
+
+SENT = 0
+FORBIDDEN = 1
+NOT_FOUND = 2
+HTTP_ERROR = 3
+ERROR = 4
+# A DM reminder handed to the DM pipeline, which then records the outcome
+# for each user as it sends.
+DM_QUEUED = 5
+OUTCOME_NAMES = ('sent', 'forbidden', 'not found', 'http error', 'error',
+                 'dm queued')
+
+# guild_id is 0 for DMs. channel_id is then the user id, or 0 for the
+# `DM_QUEUED` record of the whole batch of `recipients` users.
+Delivery = collections.namedtuple(
+    'Delivery',
+    'guild_id channel_id scheduled sent outcome recipients contest_ids')
+
+
+class DeliveryLogError(Exception):
+    pass
+
+
+def outcome_of(error):
+    """The outcome of a channel send that raised `error`, or that
+    succeeded if `error` is None."""
+    if error is None:
+        return SENT
+    if isinstance(error, discord.Forbidden):
+        return FORBIDDEN
+    if isinstance(error, discord.NotFound):
+        return NOT_FOUND
+    if isinstance(error, discord.HTTPException):
+        return HTTP_ERROR
+    return ERROR
+
+
+def _day(timestamp):
+    return dt.datetime.utcfromtimestamp(timestamp).strftime('%Y-%m-%d')
+
+
+def _parse(data, path):
+    if data[:len(_MAGIC)] != _MAGIC:
+        raise DeliveryLogError(f'{path} is not a delivery log')
+    offset = len(_MAGIC)
+    deliveries = []
+    while offset + _RECORD.size <= len(data):
+        *fields, contest_count = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        end = offset + contest_count * _CONTEST_ID.size
+        if end > len(data):
+            # Another process is appending this record.
+            break
+        contest_ids = tuple(contest_id for contest_id, in
+                            _CONTEST_ID.iter_unpack(data[offset:end]))
+        offset = end
+        deliveries.append(Delivery(*fields, contest_ids))
+    return deliveries
+
+
+class DeliveryLog:
+    def __init__(self, directory=None):
+        self.directory = directory or constants.DELIVERY_LOG_DIR
+        # (day, packed record) not yet written.
+        self._buffer = []
+        self._last_day = None
+        self._flushing = None
+
+    def record(self, guild_id, channel_id, contest_ids, scheduled, sent,
+               outcome, recipients=1):
+        data = _RECORD.pack(guild_id, channel_id, scheduled, sent, outcome,
+                            recipients, len(contest_ids))
+        data += b''.join(map(_CONTEST_ID.pack, contest_ids))
+        self._buffer.append((_day(sent), data))
+
+    @property
+    def pending(self):
+        return len(self._buffer)
+
+    async def flush(self):
+        """Writes the buffered records from an executor thread."""
+        while self._flushing is not None:
+            # Keeps the records of a day in order across flushes.
+            await asyncio.wait([self._flushing])
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        loop = asyncio.get_event_loop()
+        self._flushing = loop.run_in_executor(None, self._write, batch)
+        try:
+            await self._flushing
+        finally:
+            self._flushing = None
+
+    def _path(self, day):
+        return os.path.join(self.directory, day + _LOG_SUFFIX)
+
+    def _days(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(_LOG_SUFFIX)] for name in names
+                      if name.endswith(_LOG_SUFFIX))
+
+    def _write(self, batch):
+        os.makedirs(self.directory, exist_ok=True)
+        by_day = collections.defaultdict(list)
+        for day, data in batch:
+            by_day[day].append(data)
+        # Processes of a sharded bot share the log.
+        with files.locked(os.path.join(self.directory, _LOCK_NAME)):
+            for day, records in sorted(by_day.items()):
+                with open(self._path(day), 'ab') as log_file:
+                    if log_file.tell() == 0:
+                        log_file.write(_MAGIC)
+                    log_file.write(b''.join(records))
+            last_day = max(by_day)
+            if last_day != self._last_day:
+                self._last_day = last_day
+                self._rotate(last_day)
+
+    def _rotate(self, today):
+        oldest = dt.datetime.strptime(today, '%Y-%m-%d') \
+            - dt.timedelta(days=_RETENTION_DAYS - 1)
+        for day in self._days():
+            if day < oldest.strftime('%Y-%m-%d'):
+                # Another process of a sharded bot may have rotated it.
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(self._path(day))
+                    logger.info(f'Deleted the delivery log of {day}')
+
+    def read(self, since, guild_id=None, channel_id=None):
+        """Deliveries sent from timestamp `since` on, oldest first, of one
+        guild and channel (or DM user) if given. Blocks; run it in an
+        executor."""
+        first = _day(since)
+        deliveries = []
+        for day in self._days():
+            if day < first:
+                continue
+            path = self._path(day)
+            try:
+                with open(path, 'rb') as log_file:
+                    data = log_file.read()
+            except FileNotFoundError:
+                # Rotated meanwhile.
+                continue
+            deliveries.extend(
+                delivery for delivery in _parse(data, path)
+                if delivery.sent >= since
+                and (guild_id is None or delivery.guild_id == guild_id)
+                and (channel_id is None or delivery.channel_id == channel_id))
+        return deliveries
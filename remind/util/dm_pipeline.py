@@ -0,0 +1,102 @@
+import asyncio
+import collections
+import logging
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Discord allows about 50 requests per second globally. Members are not
+# cached, so a DM costs three of them: fetching the user, opening the DM
+# channel and sending.
+_BATCH_SIZE = 15
+_BATCH_INTERVAL = 1  # seconds
+
+
+class DmPipeline:
+    """Delivers one message to many users from a single worker task, in
+    fixed size concurrent batches paced to stay under the rate limits."""
+
+    def __init__(self, bot, *, batch_size=_BATCH_SIZE,
+                 batch_interval=_BATCH_INTERVAL):
+        self.bot = bot
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.sent = 0
+        self.failed = 0
+        # [user ids not yet sent to, content, embed, on_result] of each
+        # message.
+        self._messages = collections.deque()
+        self._wakeup = None
+        self._idle = None
+        self._task = None
+
+    def submit(self, user_ids, content=None, *, embed=None, on_result=None):
+        """Queues a message to `user_ids`. `on_result(user_id, error)` is
+        called after each send, with error None if it went through."""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._idle = asyncio.Event()
+            self._task = asyncio.create_task(self._worker())
+        self._messages.append([list(user_ids), content, embed, on_result])
+        self._idle.clear()
+        self._wakeup.set()
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def drain(self):
+        """Waits until every submitted message was sent."""
+        if self._task is not None and not self._task.done() \
+                and self._messages:
+            await self._idle.wait()
+
+    def unsent(self):
+        """(user_ids, content, embed) of what is left to send."""
+        return [(tuple(user_ids), content, embed)
+                for user_ids, content, embed, _ in self._messages
+                if user_ids]
+
+    @property
+    def pending(self):
+        return len(self._messages)
+
+    async def _worker(self):
+        while True:
+            if not self._messages:
+                self._idle.set()
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            user_ids, content, embed, on_result = self._messages[0]
+            batch = user_ids[:self.batch_size]
+            errors = await asyncio.gather(*(self._send(user_id, content, embed)
+                                            for user_id in batch))
+            if on_result is not None:
+                for user_id, error in zip(batch, errors):
+                    on_result(user_id, error)
+            del user_ids[:len(batch)]
+            if not user_ids:
+                self._messages.popleft()
+            await asyncio.sleep(self.batch_interval)
+
+    async def _send(self, user_id, content, embed):
+        try:
+            user = self.bot.get_user(user_id)
+            if user is None:
+                user = await self.bot.fetch_user(user_id)
+            await user.send(content, embed=embed)
+            self.sent += 1
+            return None
+        except discord.HTTPException as e:
+            # Mostly users who closed their DMs or left every shared guild.
+            self.failed += 1
+            logger.info(f'Could not DM user {user_id}: {e}')
+            return e
+        except Exception as e:
+            # Connection errors and timeouts must not stop the worker.
+            self.failed += 1
+            logger.warning(f'Could not DM user {user_id}: {e!r}')
+            return e
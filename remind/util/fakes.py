@@ -0,0 +1,135 @@
+"""In-process stand-ins for clist payloads and the discord objects the cogs
+touch, used by the offline benchmark and simulation runners."""
+import datetime as dt
+import itertools
+import random
+
+_WEBSITES = (
+    (1, 'codeforces.com', ('Codeforces Round #{} (Div. 2)',
+                           'Educational Codeforces Round {}',
+                           'Codeforces Round #{} (Div. 1)',
+                           'Kotlin Heroes: Episode {}')),
+    (2, 'codechef.com', ('Cook-Off {}', 'Lunchtime {}', 'Starters {}',
+                         'Unrated Practice {}')),
+    (93, 'atcoder.jp', ('AtCoder Beginner Contest {}',
+                        'AtCoder Regular Contest {}',
+                        'AtCoder Grand Contest {}',
+                        'AtCoder Heuristic Contest {}')),
+    (12, 'topcoder.com', ('SRM {}', 'TCO Round {}')),
+    (35, 'codingcompetitions.withgoogle.com', ('Kick Start Round {}',
+                                               'Code Jam Round {}')),
+    (29, 'facebook.com/hackercup', ('Hacker Cup Round {}',)),
+    (126, 'codedrills.io', ('CodeDrills Round {}',)),
+    (63, 'hackerearth.com', ('Circuits {}',)),
+)
+_DURATIONS = (90 * 60, 2 * 60 * 60, 2 * 60 * 60 + 15 * 60, 3 * 60 * 60,
+              24 * 60 * 60)
+_TIMEZONES = ('UTC', 'Asia/Kolkata', 'Europe/Moscow', 'America/New_York',
+              'Asia/Tokyo', 'Europe/Berlin', 'America/Sao_Paulo',
+              'Australia/Sydney')
+
+
+def make_clist_objects(count, *, start=None, span=dt.timedelta(days=9),
+                       seed=0):
+    """Returns `count` contests in the clist `objects` format, with start
+    times spread over `span` from `start` and aligned to 5 minutes."""
+    rng = random.Random(seed)
+    start = start or dt.datetime.utcnow() - dt.timedelta(days=2)
+    start = start.replace(second=0, microsecond=0)
+    slots = max(1, int(span.total_seconds()) // 300)
+    objects = []
+    for contest_id in range(1, count + 1):
+        resource_id, resource, names = rng.choice(_WEBSITES)
+        begin = start + dt.timedelta(seconds=300 * rng.randrange(slots))
+        objects.append({
+            'id': contest_id,
+            'event': rng.choice(names).format(contest_id),
+            'start': begin.strftime('%Y-%m-%dT%H:%M:%S'),
+            'duration': rng.choice(_DURATIONS),
+            'href': f'https://{resource}/contest/{contest_id}',
+            'resource': {'id': resource_id, 'name': resource},
+        })
+    return objects
+
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+        self.mention = f'<@&{role_id}>'
+        self.mentionable = True
+
+
+class FakeChannel:
+    """A text channel that records what would have been sent."""
+
+    def __init__(self, channel_id, guild, clock=None):
+        self.id = channel_id
+        self.guild = guild
+        self.mention = f'<#{channel_id}>'
+        self.clock = clock
+        self.sent = []
+
+    async def send(self, content=None, *, embed=None):
+        sent_at = self.clock() if self.clock else None
+        self.sent.append((sent_at, content, embed))
+
+
+class FakeGuild:
+    def __init__(self, guild_id, clock=None):
+        self.id = guild_id
+        self.name = f'guild-{guild_id}'
+        self.shard_id = 0
+        self.channel = FakeChannel(guild_id + 1, self, clock)
+        self.role = FakeRole(guild_id + 2)
+
+    def get_channel(self, channel_id):
+        return self.channel if channel_id == self.channel.id else None
+
+    def get_role(self, role_id):
+        return self.role if role_id == self.role.id else None
+
+
+class FakeBot:
+    """Just enough of `commands.Bot` for the reminder scheduler."""
+
+    def __init__(self, guilds):
+        self.guilds = list(guilds)
+        self._guild_map = {guild.id: guild for guild in self.guilds}
+        self.latency = 0.0
+
+    def get_guild(self, guild_id):
+        return self._guild_map.get(guild_id)
+
+    def get_channel(self, channel_id):
+        return None
+
+    def get_cog(self, name):
+        return None
+
+    async def wait_until_ready(self):
+        pass
+
+
+def make_guilds(count, *, clock=None, first_id=10**17):
+    ids = itertools.count(first_id, 10)
+    return [FakeGuild(next(ids), clock) for _ in range(count)]
+
+
+def fill_guild_map(guild_map, guilds, make_settings, *, seed=0):
+    """Fills `guild_map` with a varied but reproducible configuration for
+    every guild, built on top of `make_settings()` defaults."""
+    from remind.util import judges
+    from remind.util import timezones
+    rng = random.Random(seed)
+    before_choices = ([10], [10, 60], [15, 60, 180], [5, 30, 120, 1440])
+    for guild in guilds:
+        settings = make_settings()
+        settings.channel_id = guild.channel.id
+        settings.role_id = guild.role.id
+        settings.before = list(rng.choice(before_choices))
+        settings.localtimezone = timezones.get(rng.choice(_TIMEZONES))
+        for website in judges.names():
+            if rng.random() < 0.2:
+                settings.website_allowed_patterns[website] = []
+                settings.website_disallowed_patterns[website] = ['']
+        guild_map[guild.id] = settings
@@ -0,0 +1,38 @@
+import contextlib
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks on this platform; callers still get atomic writes.
+    fcntl = None
+
+
+@contextlib.contextmanager
+def locked(path):
+    """Holds an exclusive advisory lock on `path` + '.lock' across
+    processes for the duration of the block."""
+    with open(f'{path}.lock', 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def atomic_write(path, data):
+    """Writes `data` (bytes) to `path` so readers see either the old or
+    the new contents, never a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
@@ -0,0 +1,63 @@
+"""Minimal RFC 5545 (iCalendar) writer for contest feeds."""
+_LINE_LIMIT = 75  # octets, excluding the CRLF
+_PRODID = '-//aryanc403//remind//EN'
+
+
+def _escape(text):
+    return (text.replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """Splits `line` into CRLF terminated lines of at most 75 octets, without
+    breaking UTF-8 sequences."""
+    data = line.encode()
+    if len(data) <= _LINE_LIMIT:
+        return line + '\r\n'
+    parts = []
+    limit = _LINE_LIMIT
+    while data:
+        cut = min(limit, len(data))
+        # Back off to the start of a UTF-8 sequence.
+        while cut < len(data) and data[cut] & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode())
+        data = data[cut:]
+        # Continuation lines start with a space.
+        limit = _LINE_LIMIT - 1
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _format_time(time):
+    return time.strftime('%Y%m%dT%H%M%SZ')
+
+
+def event(contest, stamp):
+    """The VEVENT for `contest`, with naive UTC times; `stamp` is when this
+    version of the event was first seen."""
+    lines = (
+        'BEGIN:VEVENT',
+        f'UID:{contest.id}@clist.by',
+        f'DTSTAMP:{_format_time(stamp)}',
+        f'DTSTART:{_format_time(contest.start_time)}',
+        f'DTEND:{_format_time(contest.start_time + contest.duration)}',
+        f'SUMMARY:{_escape(contest.name)}',
+        f'LOCATION:{_escape(contest.website)}',
+        f'URL:{contest.url}',
+        f'DESCRIPTION:{_escape(contest.url)}',
+        'END:VEVENT',
+    )
+    return ''.join(map(_fold, lines))
+
+
+def calendar(name, events):
+    """Wraps the already rendered `events` into a VCALENDAR."""
+    header = ''.join(map(_fold, (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{_PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(name)}',
+    )))
+    return header + ''.join(events) + _fold('END:VCALENDAR')
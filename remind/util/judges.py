@@ -0,0 +1,103 @@
+"""Registry of the judges contests are reminded for, loaded from a JSON
+config so that supporting a judge needs no code change."""
+import json
+import logging
+from collections import namedtuple
+
+from remind import constants
+
+logger = logging.getLogger(__name__)
+
+# Contests of a judge are reminded for when their lowercase name contains
+# one of `allowed` and none of `disallowed`.
+Judge = namedtuple('Judge', 'resource_id name allowed disallowed')
+
+_by_id = None
+_by_name = None
+# Maps a `Judge` field to the judges' patterns in it by name.
+_default_patterns = None
+
+
+def load(path=None):
+    """(Re)loads the registry from `path`, the configured file by default."""
+    global _by_id, _by_name, _default_patterns
+    with open(path or constants.JUDGES_CONFIG_PATH) as config_file:
+        entries = json.load(config_file)
+    judges = [Judge(entry['resource_id'], entry['name'],
+                    tuple(entry.get('allowed', ('',))),
+                    tuple(entry.get('disallowed', ())))
+              for entry in entries]
+    _by_id = {judge.resource_id: judge for judge in judges}
+    _by_name = {judge.name: judge for judge in judges}
+    _default_patterns = {
+        field: {judge.name: getattr(judge, field) for judge in judges}
+        for field in ('allowed', 'disallowed')}
+    logger.info(f'Loaded {len(judges)} judges')
+
+
+def _registry():
+    if _by_name is None:
+        load()
+    return _by_id, _by_name
+
+
+def _defaults(field):
+    if _default_patterns is None:
+        load()
+    return _default_patterns[field]
+
+
+def names():
+    """Names of all judges, in config order."""
+    return list(_registry()[1])
+
+
+def get(name):
+    return _registry()[1].get(name)
+
+
+def lookup(resource_id, name):
+    """The judge of a clist resource. Resource ids survive clist renaming
+    a website; the name is only a fallback for ids missing from the
+    config."""
+    by_id, by_name = _registry()
+    judge = by_id.get(resource_id)
+    return judge if judge is not None else by_name.get(name)
+
+
+class _Patterns(dict):
+    """A guild's patterns by judge name. Only the guild's overrides are
+    stored; every other judge reads the registry's shared defaults."""
+    _field = None
+
+    def __missing__(self, name):
+        return _defaults(self._field).get(name, ())
+
+    def __setitem__(self, name, patterns):
+        patterns = tuple(patterns)
+        judge = get(name)
+        if judge is not None and getattr(judge, self._field) == patterns:
+            self.pop(name, None)
+        else:
+            super().__setitem__(name, patterns)
+
+    def merged(self):
+        """Every judge's patterns as a plain dict, for lookups in a loop over
+        contests; those are faster on a dict than through `__missing__`."""
+        return {**_defaults(self._field), **self}
+
+    @classmethod
+    def compact(cls, patterns):
+        """Only the overrides of fully populated (older) `patterns`."""
+        compacted = cls()
+        for name, website_patterns in patterns.items():
+            compacted[name] = website_patterns
+        return compacted
+
+
+class AllowedPatterns(_Patterns):
+    _field = 'allowed'
+
+
+class DisallowedPatterns(_Patterns):
+    _field = 'disallowed'
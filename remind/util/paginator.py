@@ -1,6 +1,8 @@
 import asyncio
 import functools
 
+from remind.util import tracing
+
 _REACT_FIRST = '\N{BLACK LEFT-POINTING DOUBLE TRIANGLE WITH VERTICAL BAR}'
 _REACT_PREV = '\N{BLACK LEFT-POINTING TRIANGLE}'
 _REACT_NEXT = '\N{BLACK RIGHT-POINTING TRIANGLE}'
@@ -71,8 +73,9 @@ class Paginated:
                 reaction, user = await bot.wait_for('reaction_add',
                                                     timeout=wait_time,
                                                     check=check)
-                await reaction.remove(user)
-                await self.reaction_map[reaction.emoji]()
+                with tracing.span('paginator reaction'):
+                    await reaction.remove(user)
+                    await self.reaction_map[reaction.emoji]()
             except asyncio.TimeoutError:
                 await self.message.clear_reactions()
                 break
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import random
+import time
+
+from remind.util import clock
+
+logger = logging.getLogger(__name__)
+
+# Maps job name to every `PeriodicJob` currently running.
+jobs = {}
+
+
+class PeriodicJob:
+    """Runs `func()` every `period` seconds (plus or minus `jitter`) from a
+    single long-lived task.
+
+    Runs never overlap: `trigger` during a run queues exactly one more run
+    straight after it. Exceptions are logged and kept in `last_error`
+    without stopping the job.
+    """
+
+    def __init__(self, name, func, period, *, jitter=0):
+        self.name = name
+        self.func = func
+        self.period = period
+        self.jitter = jitter
+        self.task = None
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.last_run_at = None
+        self.last_duration = None
+        self.max_duration = 0
+        self.total_duration = 0
+        self.last_error = None
+        self._wakeup = None
+        self._waiters = []
+
+    def start(self):
+        if self.task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self._loop())
+        jobs[self.name] = self
+
+    def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        self.task = None
+        if jobs.get(self.name) is self:
+            del jobs[self.name]
+        for waiter in self._waiters:
+            waiter.cancel()
+        self._waiters.clear()
+
+    def trigger(self):
+        """Makes the job run now, or right after the run in progress."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_now(self):
+        """Triggers a run and waits for it, raising what it raised."""
+        if self.task is None:
+            raise RuntimeError(f'Job {self.name} is not running')
+        waiter = asyncio.get_event_loop().create_future()
+        self._waiters.append(waiter)
+        self.trigger()
+        await waiter
+
+    @property
+    def mean_duration(self):
+        return self.total_duration / self.runs if self.runs else None
+
+    async def _loop(self):
+        while True:
+            await self._run_once()
+            delay = self.period + random.uniform(-self.jitter, self.jitter)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(0, delay))
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _run_once(self):
+        waiters, self._waiters = self._waiters, []
+        self.running = True
+        self.last_run_at = clock.timestamp()
+        start = time.perf_counter()
+        error = None
+        try:
+            await self.func()
+        except asyncio.CancelledError:
+            # Stopped mid-run; `stop` only sees the waiters of later runs.
+            for waiter in waiters:
+                waiter.cancel()
+            raise
+        except Exception as e:
+            error = e
+            self.failures += 1
+            self.last_error = e
+            logger.exception(f'Periodic job {self.name} failed')
+        finally:
+            self.running = False
+            duration = time.perf_counter() - start
+            self.runs += 1
+            self.last_duration = duration
+            self.total_duration += duration
+            self.max_duration = max(self.max_duration, duration)
+        for waiter in waiters:
+            if waiter.done():
+                continue
+            if error is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(error)
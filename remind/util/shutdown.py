@@ -0,0 +1,41 @@
+"""Coordinated shutdown: lets every cog finish its pending work before the
+bot disconnects and the process exits."""
+import asyncio
+import logging
+
+from remind.util import clock
+
+logger = logging.getLogger(__name__)
+
+# Fits in the 10 seconds `docker stop` waits before killing the process.
+_DRAIN_TIMEOUT = 8  # seconds
+
+
+async def shutdown(bot, exit_code, *, timeout=_DRAIN_TIMEOUT):
+    """Awaits `cog_shutdown(deadline)` of every cog that has one, closes
+    the bot and makes it exit with `exit_code`.
+
+    Cogs with a higher `shutdown_order` go later, so that the logging cog
+    can still send what the others log while they shut down.
+    """
+    if getattr(bot, 'exit_code', None) is not None:
+        # Already shutting down.
+        return
+    bot.exit_code = exit_code
+    deadline = clock.timestamp() + timeout
+    logger.info(f'Shutting down with exit code {exit_code}')
+    cogs = sorted(bot.cogs.values(),
+                  key=lambda cog: getattr(cog, 'shutdown_order', 0))
+    for cog in cogs:
+        drain = getattr(cog, 'cog_shutdown', None)
+        if drain is None:
+            continue
+        try:
+            # Cogs watch the deadline themselves; this only guards it.
+            await asyncio.wait_for(drain(deadline),
+                                   max(0, deadline - clock.timestamp()) + 1)
+        except asyncio.TimeoutError:
+            logger.warning(f'{cog.qualified_name} did not shut down in time')
+        except Exception:
+            logger.exception(f'{cog.qualified_name} failed to shut down')
+    await bot.close()
@@ -0,0 +1,72 @@
+"""Timezone lookup and fast formatting of UTC times in local time."""
+import datetime as dt
+import functools
+import zoneinfo
+
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+           'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+_EPOCH = dt.datetime(1970, 1, 1)
+_UTC_EPOCH = _EPOCH.replace(tzinfo=dt.timezone.utc)
+_BUCKET = 60 * 60  # seconds
+# Files in the system zone directory that are not real zones: `localtime`
+# follows the host's timezone and `Factory` is a placeholder.
+_PSEUDO_ZONES = frozenset({'localtime', 'Factory', 'posixrules'})
+
+
+@functools.lru_cache(maxsize=None)
+def get(name):
+    return zoneinfo.ZoneInfo(name)
+
+
+@functools.lru_cache(maxsize=None)
+def all_names():
+    return tuple(sorted(zoneinfo.available_timezones() - _PSEUDO_ZONES))
+
+
+@functools.lru_cache(maxsize=None)
+def _name_set():
+    return frozenset(all_names())
+
+
+def is_valid(name):
+    return name in _name_set()
+
+
+def from_legacy(tz):
+    """Returns the zoneinfo zone for a timezone from older settings, which
+    held pytz zones."""
+    return tz if isinstance(tz, zoneinfo.ZoneInfo) else get(str(tz))
+
+
+def _exact_offset(tz, timestamp):
+    local = (_UTC_EPOCH + dt.timedelta(seconds=timestamp)).astimezone(tz)
+    return int(local.utcoffset().total_seconds())
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _bucket_offset(tz, bucket):
+    """The UTC offset of `tz` throughout the hour `bucket`, or None if it
+    changes within that hour."""
+    start = bucket * _BUCKET
+    offset = _exact_offset(tz, start)
+    if _exact_offset(tz, start + _BUCKET - 1) != offset:
+        return None
+    return offset
+
+
+def utc_offset(tz, timestamp):
+    """The UTC offset of `tz` in seconds at the UTC `timestamp`. Offsets
+    only change at transitions, so they are looked up per hour."""
+    offset = _bucket_offset(tz, int(timestamp // _BUCKET))
+    if offset is None:
+        offset = _exact_offset(tz, timestamp)
+    return offset
+
+
+def format_utc(time, tz):
+    """Formats the naive UTC datetime `time` in `tz` like
+    strftime('%d %b %y, %H:%M') would."""
+    timestamp = (time - _EPOCH).total_seconds()
+    local = time + dt.timedelta(seconds=utc_offset(tz, timestamp))
+    return (f'{local.day:02} {_MONTHS[local.month - 1]} '
+            f'{local.year % 100:02}, {local.hour:02}:{local.minute:02}')
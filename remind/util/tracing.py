@@ -0,0 +1,171 @@
+"""Opt-in timing of the bot's hot paths.
+
+With `constants.TRACING` set, `span(name)` records how long the block it
+wraps took and a background task samples how late the event loop runs its
+callbacks. With it unset, `span` only costs a flag check.
+
+`profile(seconds)` samples the stack of the event loop thread on demand,
+whether tracing is on or not.
+"""
+import asyncio
+import collections
+import contextlib
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_SPAN_SAMPLES = 500
+# Spans at least this long are also logged.
+_SLOW_SPAN = 1  # seconds
+_LAG_INTERVAL = 0.5  # seconds
+_LAG_SAMPLES = 600
+_PROFILE_INTERVAL = 0.005  # seconds
+
+Span = collections.namedtuple('Span', 'name start duration')
+
+enabled = False
+# Most recent spans, oldest first.
+spans = collections.deque(maxlen=_SPAN_SAMPLES)
+# Maps span name to its `SpanStats`.
+stats = {}
+# Seconds the event loop ran the lag sampler late, most recent last.
+lag = collections.deque(maxlen=_LAG_SAMPLES)
+_lag_task = None
+
+
+class SpanStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.last = None
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.last = duration
+
+
+def start():
+    """Turns tracing on. Needs a running event loop."""
+    global enabled, _lag_task
+    enabled = True
+    if _lag_task is None:
+        _lag_task = asyncio.create_task(_sample_lag())
+
+
+def stop():
+    global enabled, _lag_task
+    enabled = False
+    if _lag_task is not None:
+        _lag_task.cancel()
+        _lag_task = None
+
+
+def record(name, start, duration):
+    spans.append(Span(name, start, duration))
+    span_stats = stats.get(name)
+    if span_stats is None:
+        span_stats = stats[name] = SpanStats()
+    span_stats.add(duration)
+    if duration >= _SLOW_SPAN:
+        logger.warning(f'Slow {name}: {duration * 1000:.0f}ms')
+
+
+@contextlib.contextmanager
+def span(name):
+    """Records the wall time of the block, awaits included."""
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, start, time.perf_counter() - start)
+
+
+async def before_invoke(ctx):
+    if enabled and not hasattr(ctx, 'trace_start'):
+        # Set once, by the outermost command of a group.
+        ctx.trace_start = time.perf_counter()
+
+
+async def after_invoke(ctx):
+    start = getattr(ctx, 'trace_start', None)
+    if start is None:
+        return
+    if ctx.invoked_subcommand is not None \
+            and ctx.command is not ctx.invoked_subcommand:
+        # A group's own hooks run before those of its subcommand.
+        return
+    record(f'command {ctx.command.qualified_name}', start,
+           time.perf_counter() - start)
+
+
+async def _sample_lag():
+    loop = asyncio.get_event_loop()
+    while True:
+        expected = loop.time() + _LAG_INTERVAL
+        await asyncio.sleep(_LAG_INTERVAL)
+        lag.append(max(0, loop.time() - expected))
+
+
+def _location(code):
+    return (f'{os.path.basename(code.co_filename)}:{code.co_firstlineno} '
+            f'{code.co_name}')
+
+
+def _is_idle(frame):
+    # The loop waits for events in the selector when it has nothing to run.
+    return frame.f_code.co_name == 'select' \
+        and frame.f_code.co_filename.endswith('selectors.py')
+
+
+async def profile(seconds, *, interval=_PROFILE_INTERVAL):
+    """Samples the stack of the event loop thread every `interval` for
+    `seconds`. Returns the number of samples, how many of them found the
+    loop idle and, per function location, its (self, cumulative) samples.
+    """
+    thread_id = threading.get_ident()
+    counts = collections.defaultdict(lambda: [0, 0])
+    samples = idle = 0
+    done = threading.Event()
+
+    def sample():
+        nonlocal samples, idle
+        while not done.wait(interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            samples += 1
+            if _is_idle(frame):
+                idle += 1
+                continue
+            counts[_location(frame.f_code)][0] += 1
+            seen = set()
+            while frame is not None:
+                # Recursion counts once per sample.
+                if frame.f_code not in seen:
+                    seen.add(frame.f_code)
+                    counts[_location(frame.f_code)][1] += 1
+                frame = frame.f_back
+
+    sampler = threading.Thread(target=sample, name='profiler', daemon=True)
+    sampler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        done.set()
+        sampler.join()
+    return samples, idle, {location: tuple(count)
+                           for location, count in counts.items()}
@@ -0,0 +1,118 @@
+"""Detects callbacks that block the event loop.
+
+A heartbeat scheduled on the loop stamps the time every `interval`, and a
+thread checks the stamp. When the loop is late by more than `threshold`,
+the thread grabs the stack of the loop thread, which is then still inside
+the blocking code, and logs it along with the task that was running.
+"""
+import asyncio
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+_MAX_INTERVAL = 0.1  # seconds
+_STALL_SAMPLES = 50
+_CALLBACK_RUNNER = os.path.join('asyncio', 'events.py')
+
+# (wall clock time, seconds blocked, task name, formatted stack) of a stall.
+Stall = collections.namedtuple('Stall', 'time duration task stack')
+
+# The running `LoopWatchdog`, if any.
+current = None
+
+
+def _format_stack(frame):
+    summary = traceback.extract_stack(frame)
+    # Drop the event loop's own frames down to the callback it runs.
+    for i in range(len(summary) - 1, -1, -1):
+        if summary[i].filename.endswith(_CALLBACK_RUNNER):
+            return traceback.format_list(summary[i + 1:])
+    return summary.format()
+
+
+class LoopWatchdog:
+    def __init__(self, loop, threshold):
+        self.loop = loop
+        self.threshold = threshold
+        self.interval = min(_MAX_INTERVAL, threshold / 2)
+        self.stalls = collections.deque(maxlen=_STALL_SAMPLES)
+        self.stall_count = 0
+        self.max_stall = 0
+        self._last_beat = time.monotonic()
+        self._handle = None
+        self._thread = None
+        self._stopped = threading.Event()
+        self._loop_thread_id = threading.get_ident()
+
+    def start(self):
+        self._beat()
+        self._thread = threading.Thread(target=self._watch,
+                                        name='loop watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _beat(self):
+        self._last_beat = time.monotonic()
+        self._handle = self.loop.call_later(self.interval, self._beat)
+
+    def _watch(self):
+        stalled_beat = None
+        stall = None
+        while not self._stopped.wait(self.interval):
+            last_beat = self._last_beat
+            if stalled_beat is not None:
+                if last_beat == stalled_beat:
+                    continue
+                # The loop ran again; the gap between beats is the stall.
+                duration = last_beat - stalled_beat - self.interval
+                self._end_stall(stall, duration)
+                stalled_beat = stall = None
+                continue
+            late = time.monotonic() - last_beat - self.interval
+            if late > self.threshold:
+                stalled_beat = last_beat
+                stall = self._capture(late)
+
+    def _capture(self, late):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = ''.join(_format_stack(frame)) if frame else ''
+        task = asyncio.current_task(self.loop)
+        task_name = task.get_name() if task is not None else None
+        logger.warning(f'Event loop blocked for over {late * 1000:.0f}ms '
+                       f'in task {task_name}:\n{stack}')
+        return Stall(time.time(), late, task_name, stack)
+
+    def _end_stall(self, stall, duration):
+        stall = stall._replace(duration=max(stall.duration, duration))
+        self.stalls.append(stall)
+        self.stall_count += 1
+        self.max_stall = max(self.max_stall, stall.duration)
+        logger.info(f'Event loop unblocked after '
+                    f'{stall.duration * 1000:.0f}ms')
+
+
+def start(threshold):
+    """Watches the running loop for callbacks over `threshold` seconds."""
+    global current
+    if current is not None:
+        return
+    current = LoopWatchdog(asyncio.get_event_loop(), threshold)
+    current.start()
+
+
+def stop():
+    global current
+    if current is not None:
+        current.stop()
+        current = None
@@ -6,7 +6,11 @@ cd "$(dirname "$0")"
 while true; do
 
     git pull
-    pip install -r requirements.txt
+    # Reinstall only when requirements.txt changed since the last install.
+    requirements_hash="$(sha1sum requirements.txt)"
+    if [[ "$requirements_hash" != "$(cat .requirements_installed 2>/dev/null)" ]]; then
+        pip install -r requirements.txt && echo "$requirements_hash" > .requirements_installed
+    fi
     python -m remind
     (( $? != 42 )) && break
 
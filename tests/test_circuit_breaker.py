@@ -0,0 +1,46 @@
+import unittest
+
+from remind.util import circuit_breaker
+from remind.util import clock
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        clock.set_source(lambda: self.now)
+        self.addCleanup(clock.reset_source)
+        self.breaker = circuit_breaker.CircuitBreaker(
+            failure_threshold=2, base_backoff=60, max_backoff=200)
+
+    def _fail_call(self):
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure(RuntimeError('down'))
+
+    def test_opens_after_threshold(self):
+        self._fail_call()
+        self.assertEqual(self.breaker.state, circuit_breaker.CLOSED)
+        self._fail_call()
+        self.assertEqual(self.breaker.state, circuit_breaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open_lets_one_trial_through(self):
+        self._fail_call()
+        self._fail_call()
+        self.now += 60
+        self.assertEqual(self.breaker.state, circuit_breaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, circuit_breaker.CLOSED)
+        self.assertIsNone(self.breaker.last_error)
+
+    def test_backoff_doubles_up_to_max(self):
+        self._fail_call()
+        self._fail_call()
+        backoffs = [self.breaker.backoff]
+        for _ in range(3):
+            self.now = self.breaker.retry_at
+            self._fail_call()
+            backoffs.append(self.breaker.backoff)
+        self.assertEqual(backoffs, [60, 120, 200, 200])
+        self.assertEqual(self.breaker.retry_at, self.now + 200)
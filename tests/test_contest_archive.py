@@ -0,0 +1,69 @@
+import datetime as dt
+import os
+import tempfile
+import unittest
+
+from remind.util import contest_archive
+from remind.util import fakes
+from remind.util.rounds import Round
+
+_START = dt.datetime(2021, 1, 20)
+
+
+def _fields(contest):
+    # Names and urls are stored NUL separated, so NULs are dropped.
+    return (contest.id, contest.name.replace('\0', ''), contest.start_time,
+            contest.duration, contest.url, contest.website,
+            contest.website_id)
+
+
+class ContestArchiveTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        objects = fakes.make_clist_objects(
+            200, start=_START, span=dt.timedelta(days=40), seed=3)
+        objects[0]['event'] = 'Юникод раунд\0 with NUL'
+        self.contests = [Round(contest) for contest in objects]
+
+    def test_round_trip(self):
+        archive = contest_archive.ContestArchive(self.directory)
+        self.assertEqual(archive.add(self.contests), len(self.contests))
+        # A fresh instance reads the segments back from disk.
+        scanned = contest_archive.ContestArchive(self.directory).scan(
+            _START)
+        expected = sorted(self.contests,
+                          key=lambda contest: (contest.start_time,
+                                               contest.id))
+        self.assertEqual(list(map(_fields, scanned)),
+                         list(map(_fields, expected)))
+        months = sorted(os.listdir(self.directory))
+        self.assertIn('2021-02.seg', months)
+
+    def test_add_skips_archived_contests(self):
+        archive = contest_archive.ContestArchive(self.directory)
+        archive.add(self.contests[:150])
+        self.assertEqual(archive.add(self.contests), 50)
+        self.assertEqual(len(archive.scan(_START)), len(self.contests))
+
+    def test_scan_range_and_weekly_counts(self):
+        archive = contest_archive.ContestArchive(self.directory)
+        archive.add(self.contests)
+        start = _START + dt.timedelta(days=7)
+        end = start + dt.timedelta(days=14)
+        in_range = [contest for contest in self.contests
+                    if start <= contest.start_time < end]
+        self.assertEqual(sorted(contest.id for contest
+                                in archive.scan(start, end)),
+                         sorted(contest.id for contest in in_range))
+        counts = archive.weekly_counts(start, end)
+        self.assertEqual(sum(map(sum, counts.values())), len(in_range))
+        self.assertTrue(all(len(weeks) == 2 for weeks in counts.values()))
+
+    def test_rejects_other_files(self):
+        with open(os.path.join(self.directory, '2021-01.seg'), 'wb') as f:
+            f.write(b'not a segment'.ljust(64, b'\0'))
+        archive = contest_archive.ContestArchive(self.directory)
+        with self.assertRaises(contest_archive.ArchiveError):
+            archive.scan(_START)
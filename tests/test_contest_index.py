@@ -0,0 +1,75 @@
+import copy
+import datetime as dt
+import random
+import unittest
+
+from remind.util import contest_index
+from remind.util import fakes
+from remind.util.rounds import Round
+
+_START = dt.datetime(2021, 1, 1)
+
+
+def _brute_force(contests, keywords=(), websites=(), start=None, end=None):
+    found = []
+    for contest in contests:
+        tokens = contest_index.tokenize(contest.name)
+        if not all(any(token == query if query.isdigit()
+                       else token.startswith(query) for token in tokens)
+                   for keyword in keywords
+                   for query in contest_index.tokenize(keyword)):
+            continue
+        if websites and not any(query in contest.website
+                                for query in websites):
+            continue
+        if start is not None and contest.start_time < start:
+            continue
+        if end is not None and contest.start_time >= end:
+            continue
+        found.append(contest)
+    return sorted(found, key=lambda contest: (contest.start_time, contest.id))
+
+
+class ContestIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.contests = [Round(contest) for contest in
+                         fakes.make_clist_objects(300, start=_START, seed=1)]
+        self.index = contest_index.ContestIndex()
+        self.index.update(self.contests)
+
+    def assert_searches_match(self):
+        queries = (
+            {'keywords': ('round',)},
+            {'keywords': ('codeforces', 'div')},
+            {'keywords': ('2',)},
+            {'websites': ('atcoder',)},
+            {'start': _START + dt.timedelta(days=2),
+             'end': _START + dt.timedelta(days=4)},
+            {'keywords': ('abc',), 'websites': ('codechef', 'atcoder')},
+        )
+        for query in queries:
+            self.assertEqual(self.index.search(**query),
+                             _brute_force(self.contests, **query), query)
+
+    def test_search_matches_brute_force(self):
+        self.assert_searches_match()
+
+    def test_numbers_match_whole_tokens(self):
+        found = self.index.search(keywords=('2',))
+        self.assertTrue(all('2' in contest_index.tokenize(contest.name)
+                            for contest in found))
+
+    def test_incremental_update(self):
+        rng = random.Random(2)
+        for _ in range(5):
+            rng.shuffle(self.contests)
+            del self.contests[:20]
+            # Refreshes build new contest objects rather than edit them.
+            changed = self.contests[0] = copy.copy(self.contests[0])
+            changed.name = 'Renamed Special Round'
+            changed.start_time += dt.timedelta(hours=1)
+            self.index.update(self.contests)
+            self.assertEqual(len(self.index), len(self.contests))
+            self.assert_searches_match()
+            self.assertEqual(self.index.search(keywords=('special',)),
+                             _brute_force(self.contests, ('special',)))
@@ -0,0 +1,87 @@
+import asyncio
+import datetime as dt
+import os
+import tempfile
+import unittest
+
+import discord
+
+from remind.util import delivery_log
+
+_NOW = dt.datetime(2021, 6, 15, 12).replace(
+    tzinfo=dt.timezone.utc).timestamp()
+_DAY = 24 * 60 * 60
+
+
+class _Response:
+    status = 403
+    reason = 'Forbidden'
+
+
+class DeliveryLogTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.log = delivery_log.DeliveryLog(self.directory)
+
+    async def test_round_trip(self):
+        records = [
+            (10, 20, (1, 2, 3), _NOW, _NOW + 0.25, delivery_log.SENT, 1),
+            (10, 21, (), _NOW, _NOW + 1, delivery_log.FORBIDDEN, 1),
+            (0, 0, (4,), _NOW, _NOW + 2, delivery_log.DM_QUEUED, 500),
+            (0, 2**62, (2**40,), _NOW, _NOW + 3, delivery_log.ERROR, 1),
+        ]
+        for record in records:
+            self.log.record(*record)
+        self.assertEqual(self.log.pending, len(records))
+        await self.log.flush()
+        self.assertEqual(self.log.pending, 0)
+        deliveries = delivery_log.DeliveryLog(self.directory).read(_NOW)
+        self.assertEqual(
+            [(delivery.guild_id, delivery.channel_id, delivery.contest_ids,
+              delivery.scheduled, delivery.sent, delivery.outcome,
+              delivery.recipients) for delivery in deliveries],
+            records)
+        self.assertEqual(len(self.log.read(_NOW, guild_id=10)), 2)
+        self.assertEqual(len(self.log.read(_NOW, 0, channel_id=2**62)), 1)
+
+    async def test_rotation_keeps_recent_days_and_the_lock(self):
+        for days_ago in (20, 14, 13, 0):
+            sent = _NOW - days_ago * _DAY
+            self.log.record(1, 2, (), sent, sent, delivery_log.SENT)
+        await self.log.flush()
+        names = sorted(os.listdir(self.directory))
+        self.assertEqual(names, ['2021-06-02.dlv', '2021-06-15.dlv',
+                                 'deliveries.lock'])
+        self.assertEqual(len(self.log.read(_NOW - 30 * _DAY)), 2)
+
+    async def test_concurrent_flushes_keep_order(self):
+        flushes = []
+        for i in range(100):
+            self.log.record(1, i, (), _NOW, _NOW + i, delivery_log.SENT)
+            if i % 10 == 9:
+                flushes.append(asyncio.create_task(self.log.flush()))
+                # Lets the flush start writing before the next records.
+                await asyncio.sleep(0)
+        await asyncio.gather(*flushes)
+        self.assertEqual(self.log.pending, 0)
+        self.assertEqual([delivery.channel_id
+                          for delivery in self.log.read(_NOW)],
+                         list(range(100)))
+
+    def test_torn_record_is_ignored(self):
+        self.log.record(1, 2, (3, 4), _NOW, _NOW, delivery_log.SENT)
+        self.log._write(self.log._buffer)
+        path = os.path.join(self.directory, '2021-06-15.dlv')
+        with open(path, 'ab') as log_file:
+            log_file.write(b'\1' * 10)
+        self.assertEqual(len(self.log.read(_NOW)), 1)
+
+    def test_outcome_of(self):
+        forbidden = discord.Forbidden(_Response(), 'no access')
+        self.assertEqual(delivery_log.outcome_of(None), delivery_log.SENT)
+        self.assertEqual(delivery_log.outcome_of(forbidden),
+                         delivery_log.FORBIDDEN)
+        self.assertEqual(delivery_log.outcome_of(asyncio.TimeoutError()),
+                         delivery_log.ERROR)
@@ -0,0 +1,139 @@
+import copy
+import os
+import pickle
+import tempfile
+import unittest
+import zoneinfo
+from collections import defaultdict
+from unittest import mock
+
+import pytz
+
+from remind import constants
+from remind.cogs import reminders
+from remind.util import fakes
+
+# The patterns every guild got by default before only overrides were stored.
+_BASELINE_ALLOWED_PATTERNS = defaultdict(list, {
+    'codeforces.com': [''],
+    'codechef.com': ['lunch', 'cook', 'rated'],
+    'atcoder.jp': ['abc:', 'arc:', 'agc:', 'grand', 'beginner', 'regular'],
+    'topcoder.com': ['srm', 'tco'],
+    'codingcompetitions.withgoogle.com': [''],
+    'facebook.com/hackercup': [''],
+    'codedrills.io': [''],
+})
+_BASELINE_DISALLOWED_PATTERNS = defaultdict(list, {
+    'codeforces.com': ['wild', 'fools', 'kotlin', 'unrated'],
+    'codechef.com': ['unrated'],
+    'atcoder.jp': [],
+    'topcoder.com': [],
+    'codingcompetitions.withgoogle.com': ['registration'],
+    'facebook.com/hackercup': [],
+    'codedrills.io': [],
+})
+
+
+def _baseline_settings(channel_id=None, role_id=None, before=None,
+                       timezone='UTC'):
+    """Settings as the first release kept them: a pytz zone and fully
+    populated pattern dicts."""
+    return reminders.GuildSettings(
+        channel_id, role_id, before, pytz.timezone(timezone),
+        copy.deepcopy(_BASELINE_ALLOWED_PATTERNS),
+        copy.deepcopy(_BASELINE_DISALLOWED_PATTERNS))
+
+
+def _baseline_state(settings):
+    # Settings of the first release had no `profiles`.
+    return (settings.channel_id, settings.role_id, settings.before,
+            settings.localtimezone, settings.website_allowed_patterns,
+            settings.website_disallowed_patterns)
+
+
+class GuildSettingsTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        for name in ('GUILD_SETTINGS_MAP_PATH', 'SHUTDOWN_CHECKPOINT_PATH',
+                     'CONTEST_ARCHIVE_DIR', 'DELIVERY_LOG_DIR'):
+            patcher = mock.patch.object(
+                constants, name, os.path.join(self.directory, name.lower()))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _make_cog(self):
+        return reminders.Reminders(fakes.FakeBot([]))
+
+    def _write_baseline_map(self, guild_map):
+        with open(constants.GUILD_SETTINGS_MAP_PATH, 'wb') as map_file:
+            with mock.patch.object(reminders.GuildSettings, '__getstate__',
+                                   _baseline_state):
+                pickle.dump(defaultdict(reminders.get_default_guild_settings,
+                                        guild_map), map_file)
+
+    def test_baseline_pickle_migrates_and_round_trips(self):
+        changed = _baseline_settings(11, 12, [10, 60], 'Asia/Kolkata')
+        changed.website_allowed_patterns['codeforces.com'] = ['div. 2']
+        changed.website_disallowed_patterns['codechef.com'] = [
+            'unrated', 'starters']
+        self._write_baseline_map({1: _baseline_settings(), 2: changed})
+
+        cog = self._make_cog()
+        # Untouched defaults are not kept.
+        self.assertEqual(list(cog.guild_map), [2])
+        settings = cog.guild_map[2]
+        self.assertEqual((settings.channel_id, settings.role_id,
+                          settings.before), (11, 12, [10, 60]))
+        self.assertEqual(settings.localtimezone,
+                         zoneinfo.ZoneInfo('Asia/Kolkata'))
+        self.assertEqual(settings.profiles, ())
+        self.assertEqual(dict(settings.website_allowed_patterns),
+                         {'codeforces.com': ('div. 2',)})
+        self.assertEqual(dict(settings.website_disallowed_patterns),
+                         {'codechef.com': ('unrated', 'starters')})
+        for website, patterns in _BASELINE_ALLOWED_PATTERNS.items():
+            if website != 'codeforces.com':
+                self.assertEqual(settings.website_allowed_patterns[website],
+                                 tuple(patterns))
+        self.assertEqual(
+            settings.website_disallowed_patterns['codeforces.com'],
+            ('wild', 'fools', 'kotlin', 'unrated'))
+
+        cog._serialize_guild_map()
+        reloaded = self._make_cog()
+        self.assertEqual(dict(reloaded.guild_map), dict(cog.guild_map))
+        self.assertEqual(os.listdir(self.directory),
+                         ['guild_settings_map_path'])
+
+    def test_unreadable_entry_keeps_the_others_and_the_file(self):
+        broken = _baseline_settings(21)
+        broken.localtimezone = 'Not/AZone'
+        self._write_baseline_map({1: _baseline_settings(11, 12),
+                                  2: broken})
+        with self.assertLogs('Reminders', 'ERROR'):
+            cog = self._make_cog()
+        self.assertEqual(list(cog.guild_map), [1])
+        self.assertEqual(cog.guild_map[1].channel_id, 11)
+        self.assertEqual(len([name for name in os.listdir(self.directory)
+                              if '_unreadable_' in name]), 1)
+
+    def test_unknown_guild_reads_shared_defaults(self):
+        cog = self._make_cog()
+        expected = reminders.get_default_guild_settings()
+        settings = cog.guild_map[99]
+        self.assertIs(settings, reminders._DEFAULT_GUILD_SETTINGS)
+        self.assertEqual(settings.website_allowed_patterns['codechef.com'],
+                         ('lunch', 'cook', 'rated'))
+        self.assertEqual(cog.get_guild_contests([], 99), [])
+        self.assertNotIn(99, cog.guild_map)
+        self.assertEqual(len(settings.website_allowed_patterns), 0)
+
+        edited = cog.guild_map.edit(99)
+        self.assertIsNot(edited, settings)
+        edited.channel_id = 5
+        edited.website_allowed_patterns['codechef.com'] = ['starters']
+        self.assertIs(cog.guild_map[99], edited)
+        self.assertEqual(cog.guild_map[100], expected)
+        self.assertEqual(reminders._DEFAULT_GUILD_SETTINGS, expected)
@@ -0,0 +1,58 @@
+import datetime as dt
+import unittest
+
+from remind.cogs import calendar as calendar_cog
+from remind.util import ical
+from remind.util.rounds import Round
+
+
+def _unfold(text):
+    return text.replace('\r\n ', '').split('\r\n')
+
+
+def _contest(name):
+    return Round({
+        'id': 7,
+        'event': name,
+        'start': '2021-03-14T14:35:00',
+        'duration': 2 * 60 * 60,
+        'href': 'https://codeforces.com/contest/7',
+        'resource': {'id': 1, 'name': 'codeforces.com'},
+    })
+
+
+class EventTest(unittest.TestCase):
+    def test_lines_fold_at_75_octets_without_splitting_utf8(self):
+        name = 'Раунд; с очень, длинным названием \\ ' * 5
+        text = ical.event(_contest(name), dt.datetime(2021, 3, 1))
+        for line in text.split('\r\n'):
+            self.assertLessEqual(len(line.encode()), 75)
+        summary = next(line for line in _unfold(text)
+                       if line.startswith('SUMMARY:'))
+        expected = (name.replace('\\', '\\\\').replace(';', '\\;')
+                    .replace(',', '\\,'))
+        self.assertEqual(summary, 'SUMMARY:' + expected)
+
+    def test_times_are_utc(self):
+        lines = _unfold(ical.event(_contest('Round 1'),
+                                   dt.datetime(2021, 3, 1)))
+        self.assertIn('DTSTART:20210314T143500Z', lines)
+        self.assertIn('DTEND:20210314T163500Z', lines)
+        self.assertIn('DTSTAMP:20210301T000000Z', lines)
+
+    def test_calendar_wraps_events(self):
+        event = ical.event(_contest('Round 1'), dt.datetime(2021, 3, 1))
+        lines = _unfold(ical.calendar('Contests', [event]))
+        self.assertEqual(lines[0], 'BEGIN:VCALENDAR')
+        self.assertEqual(lines[-2:], ['END:VCALENDAR', ''])
+        self.assertEqual(lines.count('BEGIN:VEVENT'), 1)
+
+
+class EtagTest(unittest.TestCase):
+    def test_etag_matches(self):
+        etag = '"abc"'
+        for header in ('"abc"', 'W/"abc"', '"x", "abc"', '*'):
+            self.assertTrue(calendar_cog._etag_matches(header, etag), header)
+        for header in ('', '"abcd"', '"x"'):
+            self.assertFalse(calendar_cog._etag_matches(header, etag),
+                             header)
@@ -0,0 +1,45 @@
+import asyncio
+import unittest
+
+from remind.util import periodic
+
+
+class PeriodicJobTest(unittest.IsolatedAsyncioTestCase):
+    async def test_run_now_raises_what_the_run_raised(self):
+        calls = []
+
+        async def func():
+            calls.append(None)
+            if len(calls) == 2:
+                raise ValueError('bad run')
+
+        job = periodic.PeriodicJob('test', func, 3600)
+        job.start()
+        self.addCleanup(job.stop)
+        await asyncio.sleep(0)
+        with self.assertRaises(ValueError):
+            await job.run_now()
+        await job.run_now()
+        self.assertEqual((job.runs, job.failures), (3, 1))
+        self.assertIsInstance(job.last_error, ValueError)
+
+    async def test_stop_cancels_waiter_of_run_in_flight(self):
+        started = asyncio.Event()
+        calls = []
+
+        async def func():
+            calls.append(None)
+            if len(calls) > 1:
+                # The run triggered by `run_now` hangs until stopped.
+                started.set()
+                await asyncio.sleep(3600)
+
+        job = periodic.PeriodicJob('test', func, 3600)
+        job.start()
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(job.run_now())
+        await started.wait()
+        job.stop()
+        with self.assertRaises(asyncio.CancelledError):
+            await asyncio.wait_for(waiter, 1)
+        self.assertNotIn('test', periodic.jobs)
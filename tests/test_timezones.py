@@ -0,0 +1,50 @@
+import datetime as dt
+import random
+import unittest
+
+from remind.util import timezones
+
+_ZONES = ('UTC', 'Asia/Kolkata', 'America/New_York', 'Europe/London',
+          'Australia/Lord_Howe', 'Pacific/Chatham', 'America/St_Johns')
+
+
+class FormatUtcTest(unittest.TestCase):
+    def assert_matches_strftime(self, time, tz):
+        expected = time.replace(tzinfo=dt.timezone.utc).astimezone(
+            tz).strftime('%d %b %y, %H:%M')
+        self.assertEqual(timezones.format_utc(time, tz), expected,
+                         f'{time} in {tz}')
+
+    def test_matches_strftime_at_random_times(self):
+        rng = random.Random(0)
+        start = dt.datetime(2000, 1, 1)
+        for _ in range(20000):
+            time = start + dt.timedelta(
+                minutes=rng.randrange(40 * 365 * 24 * 60))
+            self.assert_matches_strftime(time, timezones.get(
+                rng.choice(_ZONES)))
+
+    def test_matches_strftime_around_transitions(self):
+        # Every minute of the hours around two DST changes, including the
+        # half hour shift of Lord Howe.
+        for name, start in (('America/New_York', dt.datetime(2021, 3, 14)),
+                            ('America/New_York', dt.datetime(2021, 11, 7)),
+                            ('Australia/Lord_Howe', dt.datetime(2021, 4, 3)),
+                            ('Australia/Lord_Howe',
+                             dt.datetime(2021, 10, 2))):
+            tz = timezones.get(name)
+            for minute in range(2 * 24 * 60):
+                self.assert_matches_strftime(
+                    start + dt.timedelta(minutes=minute), tz)
+
+
+class ValidationTest(unittest.TestCase):
+    def test_rejects_pseudo_zones(self):
+        self.assertTrue(timezones.is_valid('Asia/Kolkata'))
+        for name in ('localtime', 'Factory', 'posixrules', 'Nowhere/Town'):
+            self.assertFalse(timezones.is_valid(name), name)
+
+    def test_from_legacy_converts_zone_names(self):
+        import pytz
+        self.assertEqual(timezones.from_legacy(pytz.timezone('Asia/Tokyo')),
+                         timezones.get('Asia/Tokyo'))